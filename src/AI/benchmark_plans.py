@@ -0,0 +1,78 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+from main import ExerciseIndex, generate_ml_workout_plan, load_datasets, plan_rng
+
+DATABASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "database")
+DEFAULT_MEMBERS_FILE = os.path.join(DATABASE_DIR, "gym_members_exercise_tracking.csv")
+DEFAULT_EXERCISES_FILE = os.path.join(DATABASE_DIR, "megaGymDataset.csv")
+
+# Profiles covering each predicted focus, with and without a preferred type and focused body parts
+SCENARIOS = [
+    ('Fat_Loss', None, None),
+    ('Muscle_Gain', None, None),
+    ('General_Fitness', None, None),
+    ('Muscle_Gain', 'Strength', ['Chest', 'Biceps']),
+    ('Fat_Loss', 'Cardio', ['Full Body']),
+    ('General_Fitness', None, ['Quadriceps', 'Abdominals']),
+]
+LEVELS = ['Beginner', 'Intermediate', 'Expert']
+WEIGHTS_KG = [60.0, 75.0, 95.0]  # at 1.75 m, below and above the BMI 25 HIIT threshold
+
+
+# ------------------------------
+# Plan Generation Benchmark
+# ------------------------------
+def benchmark_plan_generation(catalog, workout_days=7, exercises_per_day=10, repeat=2000):
+    """
+    Times generate_ml_workout_plan for a workout_days x exercises_per_day plan, cycling
+    through SCENARIOS, LEVELS and WEIGHTS_KG with a per-plan generator as the serving path does.
+    The ExerciseIndex is built once, as PlanEngine does. Returns timings in milliseconds.
+    """
+    index = ExerciseIndex(catalog)
+    timings = []
+    for i in range(repeat):
+        predicted_focus, preferred_workout, focused_body_parts = SCENARIOS[i % len(SCENARIOS)]
+        user_data = {'Level': LEVELS[i % len(LEVELS)],
+                     'Weight (kg)': WEIGHTS_KG[i // len(LEVELS) % len(WEIGHTS_KG)], 'Height_m': 1.75,
+                     'Workout_Days': workout_days, 'Exercises_Per_Day': exercises_per_day}
+        rng = plan_rng(str(i))
+        start = time.perf_counter()
+        generate_ml_workout_plan(user_data, catalog, predicted_focus, preferred_workout, focused_body_parts,
+                                 index=index, rng=rng)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1e3
+    return {'plans': repeat, 'workout_days': workout_days, 'exercises_per_day': exercises_per_day,
+            'mean_ms': float(timings.mean()), 'p50_ms': float(np.percentile(timings, 50)),
+            'p99_ms': float(np.percentile(timings, 99))}
+
+
+# ------------------------------
+# Main Function with CLI via argparse
+# ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Time workout plan generation")
+    parser.add_argument('--members_file', type=str, default=DEFAULT_MEMBERS_FILE, help="Gym members dataset CSV")
+    parser.add_argument('--exercises_file', type=str, default=DEFAULT_EXERCISES_FILE, help="Exercises dataset CSV")
+    parser.add_argument('--workout_days', type=int, default=7, help="Days per plan")
+    parser.add_argument('--exercises_per_day', type=int, default=10, help="Exercises per day")
+    parser.add_argument('--repeat', type=int, default=2000, help="Number of plans to time")
+    args = parser.parse_args()
+
+    try:
+        catalog, _ = load_datasets(args.members_file, args.exercises_file)
+        result = benchmark_plan_generation(catalog, args.workout_days, args.exercises_per_day, args.repeat)
+    except Exception as e:
+        logging.error(f"Benchmark Error: {e}")
+        sys.exit(1)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+
+from main import clean_members_dataset
+from model_store import DEFAULT_MODEL_DIR, file_sha256
+from plan_engine import PlanEngine
+
+DATABASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "database")
+DEFAULT_CATALOG_MEMBERS_FILE = os.path.join(DATABASE_DIR, "gym_members_exercise_tracking.csv")
+DEFAULT_EXERCISES_FILE = os.path.join(DATABASE_DIR, "megaGymDataset.csv")
+
+# Set once per worker process by _init_worker
+_engine = None
+
+
+# ------------------------------
+# Worker Functions
+# ------------------------------
+def _init_worker(catalog_members_file, exercises_file, model_dir, model_version):
+    """Loads the exercise catalog and the model once per worker process."""
+    global _engine
+    _engine = PlanEngine.from_files(catalog_members_file, exercises_file, model_dir, model_version)
+
+
+def member_to_request(member, exercises_per_day):
+    """Turns a cleaned member row into a plan request; the workout days follow the member's frequency."""
+    user_data = {
+        'Age': member['Age'],
+        'Gender': member['Gender'],
+        'Level': member['Level'],
+        'Weight (kg)': member['Weight (kg)'],
+        'Height_m': member['Height_m'],
+        'Resting_BPM': member['Resting_BPM'],
+        'Fat_Percentage': member['Fat_Percentage'],
+        'Water_Intake (liters)': member['Water_Intake (liters)'],
+        'Workout_Frequency (days/week)': member['Workout_Frequency (days/week)'],
+        'Workout_Days': int(min(max(member['Workout_Frequency (days/week)'], 1), 7)),
+        'Exercises_Per_Day': exercises_per_day
+    }
+    return user_data, None, [], member['member_id']
+
+
+def _generate_chunk(chunk_id, members, exercises_per_day):
+    """Scores one chunk of members and returns the rows to write."""
+    requests = [member_to_request(member, exercises_per_day) for member in members]
+    return chunk_id, [
+        (int(member['member_id']), str(prediction), json.dumps(workout_plan), _engine.model_version)
+        for member, (prediction, workout_plan) in zip(members, _engine.generate_many(requests))
+    ]
+
+
+# ------------------------------
+# Output Writers
+# ------------------------------
+class SQLitePlanWriter:
+    """
+    Writes plans to a SQLite table and records finished chunks so a rerun can resume.
+    The run's input and chunking are stored in run_metadata, since chunk ids only mean
+    something for the same members file and chunk_size.
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS workout_plans (
+                member_id INTEGER PRIMARY KEY,
+                predicted_fitness_focus TEXT,
+                workout_plan TEXT,
+                model_version TEXT
+            )
+        """)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS completed_chunks (chunk_id INTEGER PRIMARY KEY)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS run_metadata (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+
+    def completed_chunks(self):
+        return {row[0] for row in self.conn.execute("SELECT chunk_id FROM completed_chunks")}
+
+    def run_metadata(self):
+        rows = dict(self.conn.execute("SELECT key, value FROM run_metadata"))
+        return json.loads(rows['run']) if 'run' in rows else None
+
+    def set_run_metadata(self, metadata):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO run_metadata VALUES ('run', ?)", (json.dumps(metadata),))
+
+    def write(self, chunk_id, rows):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO workout_plans VALUES (?, ?, ?, ?)", rows)
+            self.conn.execute("INSERT OR REPLACE INTO completed_chunks VALUES (?)", (chunk_id,))
+
+    def close(self):
+        self.conn.close()
+
+
+PART_FILE_PATTERN = re.compile(r'part-(\d+)\.parquet')
+RUN_METADATA_FILENAME = "_run.json"
+
+
+class ParquetPlanWriter:
+    """
+    Writes one Parquet file per chunk into a directory; existing part files mark finished
+    chunks and _run.json records the run's input and chunking.
+    """
+
+    def __init__(self, path):
+        try:
+            import pyarrow  # noqa: F401 (pandas needs it for to_parquet)
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow); use a .db output instead.")
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def completed_chunks(self):
+        matches = (PART_FILE_PATTERN.fullmatch(name) for name in os.listdir(self.path))
+        return {int(match.group(1)) for match in matches if match}
+
+    def run_metadata(self):
+        path = os.path.join(self.path, RUN_METADATA_FILENAME)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def set_run_metadata(self, metadata):
+        tmp_path = os.path.join(self.path, f".{RUN_METADATA_FILENAME}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, os.path.join(self.path, RUN_METADATA_FILENAME))
+
+    def write(self, chunk_id, rows):
+        df = pd.DataFrame(rows, columns=['member_id', 'predicted_fitness_focus', 'workout_plan', 'model_version'])
+        tmp_path = os.path.join(self.path, f".part-{chunk_id:05d}.parquet.tmp")
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(self.path, f"part-{chunk_id:05d}.parquet"))
+
+    def close(self):
+        pass
+
+
+def open_writer(output):
+    if output.endswith('.parquet'):
+        return ParquetPlanWriter(output)
+    return SQLitePlanWriter(output)
+
+
+# ------------------------------
+# Bulk Generation
+# ------------------------------
+def check_resumable(writer, output, run):
+    """
+    Records run (members file hash and chunk_size) in a new output, or checks that an
+    existing output was written by the same run; chunk ids of another run would skip
+    or duplicate members.
+    """
+    previous = writer.run_metadata()
+    if previous is None and writer.completed_chunks():
+        raise ValueError(f"{output} has finished chunks but no run metadata; write to a new output")
+    if previous is not None and previous != run:
+        raise ValueError(f"{output} was written with chunk_size {previous['chunk_size']} from "
+                         f"{previous['members_file']} (sha256 {previous['members_sha256'][:12]}); "
+                         f"resume with the same members file and chunk_size, or write to a new output")
+    if previous is None:
+        writer.set_run_metadata(run)
+
+
+def read_member_chunks(members_file, chunk_size, skip_chunks=()):
+    """Yields (chunk_id, cleaned member records) with a stable member_id (row number in the file)."""
+    for chunk_id, chunk in enumerate(pd.read_csv(members_file, chunksize=chunk_size)):
+        if chunk_id in skip_chunks:
+            continue
+        chunk = clean_members_dataset(chunk)
+        if 'member_id' not in chunk.columns:
+            chunk['member_id'] = chunk.index
+        yield chunk_id, chunk.to_dict('records')
+
+
+def generate_bulk_plans(members_file, output, workers=None, chunk_size=5000, exercises_per_day=6,
+                        catalog_members_file=DEFAULT_CATALOG_MEMBERS_FILE, exercises_file=DEFAULT_EXERCISES_FILE,
+                        model_dir=DEFAULT_MODEL_DIR, model_version=None):
+    """
+    Generates a plan for every member in members_file across a process pool and writes
+    the results to output chunk by chunk. Chunks already recorded in output are skipped,
+    so an interrupted run can simply be restarted with the same members file and chunk_size.
+    """
+    workers = workers or os.cpu_count() or 1
+    writer = open_writer(output)
+    run = {'members_file': os.path.abspath(members_file), 'members_sha256': file_sha256(members_file),
+           'chunk_size': chunk_size}
+    try:
+        check_resumable(writer, output, run)
+    except Exception:
+        writer.close()
+        raise
+    done = writer.completed_chunks()
+    with open(members_file) as f:
+        total_rows = max(sum(1 for _ in f) - 1, 0)
+    total_chunks = -(-total_rows // chunk_size)
+    if done:
+        logging.info(f"Resuming: {len(done)} of {total_chunks} chunks already written to {output}")
+    chunks = read_member_chunks(members_file, chunk_size, skip_chunks=done)
+    start = time.monotonic()
+    written_rows = 0
+    failed_chunks = []
+
+    def write_completed(futures):
+        nonlocal written_rows
+        for future in futures:
+            chunk_id = pending.pop(future)
+            try:
+                _, rows = future.result()
+            except Exception as e:
+                logging.error(f"Chunk {chunk_id} failed: {e}")
+                failed_chunks.append(chunk_id)
+                continue
+            writer.write(chunk_id, rows)
+            done.add(chunk_id)
+            written_rows += len(rows)
+            elapsed = time.monotonic() - start
+            logging.info(f"Progress: {len(done)}/{total_chunks} chunks, "
+                         f"{written_rows} plans this run ({written_rows / elapsed:.0f} plans/s)")
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(catalog_members_file, exercises_file, model_dir, model_version)) as pool:
+            pending = {}
+            # Keep only a couple of chunks per worker in flight so memory stays bounded
+            for chunk_id, members in chunks:
+                pending[pool.submit(_generate_chunk, chunk_id, members, exercises_per_day)] = chunk_id
+                if len(pending) >= 2 * workers:
+                    completed, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    write_completed(completed)
+            write_completed(list(concurrent.futures.as_completed(pending)))
+    finally:
+        writer.close()
+    if failed_chunks:
+        logging.error(f"{len(failed_chunks)} chunk(s) failed: {sorted(failed_chunks)}. Rerun to retry them.")
+    return written_rows
+
+
+# ------------------------------
+# Main Function with CLI via argparse
+# ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Precompute workout plans for every member in a file")
+    parser.add_argument('--members_file', type=str, required=True, help="Members CSV to generate plans for")
+    parser.add_argument('--output', type=str, required=True,
+                        help="SQLite database (e.g. plans.db) or Parquet directory (ending in .parquet)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--chunk_size', type=int, default=5000, help="Members per chunk (unit of resume)")
+    parser.add_argument('--exercises_per_day', type=int, default=6, help="Exercises per workout day")
+    parser.add_argument('--catalog_members_file', type=str, default=DEFAULT_CATALOG_MEMBERS_FILE,
+                        help="Members CSV the exercise catalog is built from")
+    parser.add_argument('--exercises_file', type=str, default=DEFAULT_EXERCISES_FILE,
+                        help="Path to the exercises dataset CSV")
+    parser.add_argument('--model_dir', type=str, default=DEFAULT_MODEL_DIR, help="Directory of model versions")
+    parser.add_argument('--model_version', type=str, default=None, help="Model version (default: newest)")
+    args = parser.parse_args()
+
+    try:
+        written = generate_bulk_plans(args.members_file, args.output, args.workers, args.chunk_size,
+                                      args.exercises_per_day, args.catalog_members_file, args.exercises_file,
+                                      args.model_dir, args.model_version)
+    except Exception as e:
+        logging.error(f"Bulk generation failed: {e}")
+        sys.exit(1)
+    logging.info(f"Wrote {written} plans to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+from fast_inference import RowTransformer
+from model_store import DEFAULT_MODEL_DIR, json_default, load_model_artifact, publish_directory, resolve_model_version
+
+COMPILED_FORMAT_VERSION = 1
+COMPILED_DIRNAME = "compiled"
+META_FILENAME = "meta.json"
+FOREST_ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'roots']
+
+
+# ------------------------------
+# Compiled Forest
+# ------------------------------
+class CompiledForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous arrays. All trees share
+    one node table: feature, threshold, left and right child (absolute node indices)
+    and the normalized class distribution of every node. Leaves point to themselves,
+    so a batch walks every tree in lockstep for max_depth steps.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = np.asarray(classes)
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_estimator(cls, forest):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            value = tree.value[:, 0, :]
+            values.append(value / value.sum(axis=1, keepdims=True))
+            roots.append(offset)
+            offset += tree.node_count
+        return cls(np.concatenate(features).astype(np.int32),
+                   np.concatenate(thresholds).astype(np.float64),
+                   np.concatenate(lefts).astype(np.int32),
+                   np.concatenate(rights).astype(np.int32),
+                   np.concatenate(values).astype(np.float64),
+                   np.array(roots, dtype=np.int32),
+                   forest.classes_,
+                   max(estimator.tree_.max_depth for estimator in forest.estimators_))
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def prune(self, n_trees=None, max_depth=None):
+        """
+        Returns a smaller forest: the first n_trees trees, each cut at max_depth (the node
+        reached at that depth becomes a leaf predicting its class distribution). Only the
+        nodes still reachable are kept.
+        """
+        n_trees = min(n_trees or self.n_trees, self.n_trees)
+        max_depth = self.max_depth if max_depth is None else min(max_depth, self.max_depth)
+        keep, depth = [], {}
+        for root in self.roots[:n_trees]:
+            stack = [(int(root), 0)]
+            while stack:
+                node, node_depth = stack.pop()
+                keep.append(node)
+                depth[node] = node_depth
+                if self.left[node] != node and node_depth < max_depth:
+                    stack.append((int(self.right[node]), node_depth + 1))
+                    stack.append((int(self.left[node]), node_depth + 1))
+        keep = np.array(sorted(keep), dtype=np.int64)
+        is_leaf = np.array([self.left[node] == node or depth[node] == max_depth for node in keep])
+        renumber = np.full(len(self.feature), -1, dtype=np.int64)
+        renumber[keep] = np.arange(len(keep))
+        positions = np.arange(len(keep))
+        return CompiledForest(np.where(is_leaf, 0, self.feature[keep]).astype(np.int32),
+                              np.where(is_leaf, np.inf, self.threshold[keep]),
+                              np.where(is_leaf, positions, renumber[self.left[keep]]).astype(np.int32),
+                              np.where(is_leaf, positions, renumber[self.right[keep]]).astype(np.int32),
+                              np.asarray(self.value[keep]),
+                              renumber[self.roots[:n_trees]].astype(np.int32),
+                              self.classes_, max_depth)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in FOREST_ARRAYS)
+
+    def apply(self, X):
+        """Leaf node index of every sample in every tree, shape (n_samples, n_trees)."""
+        # sklearn's trees compare float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), self.n_trees))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        """Mean leaf class distribution over the trees, ordered like classes_."""
+        return self.value[self.apply(X)].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+class CompiledModel:
+    """Preprocessing parameters plus a CompiledForest; scores raw profiles without sklearn."""
+
+    def __init__(self, transformer, forest, metadata=None):
+        self.transformer = transformer
+        self.forest = forest
+        self.classes_ = forest.classes_
+        self.metadata = metadata or {}
+
+    @classmethod
+    def from_pipeline(cls, pipeline, metadata=None):
+        return cls(RowTransformer.from_pipeline(pipeline),
+                   CompiledForest.from_estimator(pipeline.named_steps['classifier']), metadata)
+
+    def predict_proba(self, rows):
+        """Class probabilities for a list of profiles (dicts or NumPy rows in RAW_FIELDS order)."""
+        return self.forest.predict_proba(self.transformer.transform_many(rows))
+
+    def predict(self, rows):
+        return self.classes_[self.predict_proba(rows).argmax(axis=1)]
+
+
+# ------------------------------
+# Export and Load
+# ------------------------------
+def _preprocessing_meta(transformer):
+    """Splits the RowTransformer parameters into JSON-friendly values and NumPy arrays."""
+    meta, arrays = {}, {'support': transformer.support}
+    if transformer.numeric is not None:
+        numeric = transformer.numeric
+        meta['numeric'] = {'columns': numeric['columns'],
+                           'with_mean': numeric['mean'] is not None,
+                           'with_scale': numeric['scale'] is not None}
+        for key in ['statistics', 'kept', 'powers', 'mean', 'scale']:
+            if numeric[key] is not None:
+                arrays[f"numeric_{key}"] = numeric[key]
+    if transformer.categorical is not None:
+        categorical = transformer.categorical
+        meta['categorical'] = {'columns': categorical['columns'],
+                               'statistics': categorical['statistics'],
+                               'categories': [list(lookup) for lookup in categorical['categories']]}
+    return meta, arrays
+
+
+def _load_preprocessing(meta, arrays):
+    numeric = None
+    if 'numeric' in meta:
+        numeric = {'columns': meta['numeric']['columns'],
+                   'statistics': arrays['numeric_statistics'],
+                   'kept': arrays['numeric_kept'],
+                   'powers': arrays['numeric_powers'],
+                   'mean': arrays['numeric_mean'] if meta['numeric']['with_mean'] else None,
+                   'scale': arrays['numeric_scale'] if meta['numeric']['with_scale'] else None}
+    categorical = None
+    if 'categorical' in meta:
+        categories = meta['categorical']['categories']
+        categorical = {'columns': meta['categorical']['columns'],
+                       'statistics': meta['categorical']['statistics'],
+                       'categories': [{category: i for i, category in enumerate(c)} for c in categories],
+                       'widths': [len(c) for c in categories]}
+    return RowTransformer(numeric, categorical, arrays['support'])
+
+
+def save_compiled_model(compiled, path):
+    """
+    Writes a CompiledModel as a directory of .npy files plus meta.json. The directory is
+    assembled under a temporary name and published with publish_directory.
+    """
+    preprocessing, arrays = _preprocessing_meta(compiled.transformer)
+    forest = compiled.forest
+    arrays.update({name: getattr(forest, name) for name in FOREST_ARRAYS})
+    meta = {
+        'format_version': COMPILED_FORMAT_VERSION,
+        'classes': forest.classes_.tolist(),
+        'max_depth': int(forest.max_depth),
+        'n_trees': forest.n_trees,
+        'n_nodes': len(forest.feature),
+        'preprocessing': preprocessing,
+        'metadata': compiled.metadata,
+    }
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp_dir = tempfile.mkdtemp(prefix=".compiled-", dir=parent)
+    os.chmod(tmp_dir, 0o755)  # mkdtemp creates it private; serving workers may run as another user
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(tmp_dir, META_FILENAME), 'w') as f:
+            json.dump(meta, f, indent=2, default=json_default)
+        publish_directory(tmp_dir, path)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    logging.info(f"Saved compiled model ({forest.n_trees} trees, {len(forest.feature)} nodes) to {path}")
+
+
+def load_compiled_model(path, mmap=True):
+    """
+    Loads a compiled model. With mmap the arrays are memory-mapped read-only, so worker
+    processes serving the same files share one copy in the page cache.
+    """
+    path = os.path.realpath(path)  # read one published directory even if it is swapped meanwhile
+    with open(os.path.join(path, META_FILENAME)) as f:
+        meta = json.load(f)
+    if meta.get('format_version') != COMPILED_FORMAT_VERSION:
+        raise ValueError(f"Unsupported compiled model format {meta.get('format_version')} in {path}")
+    arrays = {name[:-4]: np.load(os.path.join(path, name), mmap_mode='r' if mmap else None)
+              for name in os.listdir(path) if name.endswith('.npy')}
+    forest = CompiledForest(*(arrays[name] for name in FOREST_ARRAYS), meta['classes'], meta['max_depth'])
+    return CompiledModel(_load_preprocessing(meta['preprocessing'], arrays), forest, meta.get('metadata'))
+
+
+def add_compiled_model(model, version_dir, version):
+    """Writes the compiled form of model into version_dir, e.g. as save_model_artifact's add_files."""
+    save_compiled_model(CompiledModel.from_pipeline(model, {'version': version}),
+                        os.path.join(version_dir, COMPILED_DIRNAME))
+
+
+def compile_model_version(model_dir=DEFAULT_MODEL_DIR, version=None, output=None):
+    """Compiles a stored model version; by default into a "compiled" directory inside the version."""
+    version = version or resolve_model_version(model_dir)
+    model, metadata = load_model_artifact(model_dir, version)
+    output = output or os.path.join(model_dir, version, COMPILED_DIRNAME)
+    save_compiled_model(CompiledModel.from_pipeline(model, {'version': version}), output)
+    return output
+
+
+# ------------------------------
+# Main Function with CLI via argparse
+# ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Export a trained model version as compiled NumPy arrays")
+    parser.add_argument('--model_dir', type=str, default=DEFAULT_MODEL_DIR, help="Directory holding model versions")
+    parser.add_argument('--model_version', type=str, default=None, help="Model version (default: serving version)")
+    parser.add_argument('--output', type=str, default=None,
+                        help="Output directory (default: <model_dir>/<version>/compiled)")
+    args = parser.parse_args()
+
+    try:
+        compile_model_version(args.model_dir, args.model_version, args.output)
+    except Exception as e:
+        logging.error(f"Compile Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
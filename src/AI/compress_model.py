@@ -0,0 +1,162 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import balanced_accuracy_score
+
+from compiled_forest import CompiledModel, load_compiled_model, save_compiled_model
+from main import fitness_goal_split, load_members_dataset
+from model_store import DEFAULT_MODEL_DIR, MODEL_FILENAME, json_default, load_model_artifact, resolve_model_version
+
+COMPRESSED_DIRNAME = "compressed"
+
+
+# ------------------------------
+# Helper Functions
+# ------------------------------
+def _dir_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def _latency_ms(predict_one, rows, repeat=200):
+    """p50/p99 single-profile predict latency in milliseconds."""
+    timings = []
+    for row in (rows * (repeat // len(rows) + 1))[:repeat]:
+        start = time.perf_counter()
+        predict_one(row)
+        timings.append(time.perf_counter() - start)
+    return {'p50_ms': float(np.percentile(timings, 50) * 1e3), 'p99_ms': float(np.percentile(timings, 99) * 1e3)}
+
+
+def _timed_load(load, path, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(path)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1e3)
+
+
+def candidate_grid(forest):
+    """Tree counts doubling from 5 up to the full forest, crossed with depth caps from 3 to uncapped."""
+    tree_counts = sorted({min(n, forest.n_trees) for n in 5 * 2 ** np.arange(12)} | {forest.n_trees})
+    depths = list(range(3, forest.max_depth)) + [forest.max_depth]
+    return [(n_trees, depth) for n_trees in tree_counts for depth in depths]
+
+
+# ------------------------------
+# Accuracy-budgeted Compression
+# ------------------------------
+def compress_forest(compiled, X_test, y_test, max_accuracy_loss=0.005):
+    """
+    Scores every sub-forest of candidate_grid on the held-out rows and picks the one
+    with the fewest nodes whose balanced accuracy is within max_accuracy_loss of the
+    full forest. Sub-forests keep the first trees; random forest trees are exchangeable,
+    so a prefix is as good a choice as any. Returns (compressed forest, candidate scores).
+    """
+    features = compiled.transformer.transform_many(X_test)
+    baseline = balanced_accuracy_score(y_test, compiled.forest.predict(features))
+    candidates = []
+    for n_trees, max_depth in candidate_grid(compiled.forest):
+        forest = compiled.forest.prune(n_trees, max_depth)
+        score = balanced_accuracy_score(y_test, forest.predict(features))
+        candidates.append({'n_trees': n_trees, 'max_depth': max_depth, 'n_nodes': len(forest.feature),
+                           'balanced_accuracy': score, 'accuracy_loss': baseline - score})
+    eligible = [c for c in candidates if c['accuracy_loss'] <= max_accuracy_loss]
+    best = min(eligible, key=lambda c: (c['n_nodes'], -c['balanced_accuracy']))
+    logging.info(f"Full forest: {compiled.forest.n_trees} trees, balanced accuracy {baseline:.4f}; "
+                 f"picked {best['n_trees']} trees at depth {best['max_depth']} "
+                 f"({best['balanced_accuracy']:.4f}, {best['n_nodes']} nodes)")
+    return compiled.forest.prune(best['n_trees'], best['max_depth']), candidates
+
+
+def compress_model_version(members_file, model_dir=DEFAULT_MODEL_DIR, version=None, output=None,
+                           max_accuracy_loss=0.005, report_path=None):
+    """
+    Compresses a stored model version into a compiled model (by default a "compressed"
+    directory inside the version) and reports size, load time, p50/p99 latency and
+    held-out balanced accuracy for the pickled pipeline, the full compiled forest and
+    the compressed one.
+    """
+    version = version or resolve_model_version(model_dir)
+    model, _ = load_model_artifact(model_dir, version)
+    _, X_test, _, y_test = fitness_goal_split(load_members_dataset(members_file))
+    rows = X_test.to_dict('records')
+    full = CompiledModel.from_pipeline(model, {'version': version})
+    forest, candidates = compress_forest(full, rows, y_test, max_accuracy_loss)
+    compressed = CompiledModel(full.transformer, forest,
+                               {'version': version, 'compressed': True, 'max_accuracy_loss': max_accuracy_loss})
+    output = output or os.path.join(model_dir, version, COMPRESSED_DIRNAME)
+    save_compiled_model(compressed, output)
+
+    pipeline_path = os.path.join(model_dir, version, MODEL_FILENAME)
+    full_path = os.path.join(model_dir, version, 'compiled')
+    if not os.path.isdir(full_path):
+        full_path = None
+    report = {
+        'version': version,
+        'max_accuracy_loss': max_accuracy_loss,
+        'pipeline': {
+            'n_trees': full.forest.n_trees,
+            'size_bytes': _dir_size(pipeline_path),
+            'load_ms': _timed_load(joblib.load, pipeline_path, repeat=3),
+            'balanced_accuracy': balanced_accuracy_score(y_test, model.predict(X_test)),
+            **_latency_ms(lambda row: model.predict_proba(pd.DataFrame([row])), rows, repeat=100),
+        },
+    }
+    for name, compiled, path in [('compiled', full, full_path), ('compressed', compressed, output)]:
+        report[name] = {
+            'n_trees': compiled.forest.n_trees,
+            'max_depth': int(compiled.forest.max_depth),
+            'n_nodes': len(compiled.forest.feature),
+            'size_bytes': _dir_size(path) if path else compiled.forest.nbytes,
+            'load_ms': _timed_load(load_compiled_model, path) if path else None,
+            'balanced_accuracy': balanced_accuracy_score(y_test, compiled.predict(rows)),
+            **_latency_ms(lambda row: compiled.predict_proba([row]), rows),
+        }
+    report['candidates'] = candidates
+    for name in ['pipeline', 'compiled', 'compressed']:
+        stats = report[name]
+        logging.info(f"{name}: {stats['n_trees']} trees, {stats['size_bytes'] / 1024:.0f} KiB, "
+                     f"load {stats['load_ms'] or 0:.1f} ms, p50 {stats['p50_ms']:.2f} ms, "
+                     f"p99 {stats['p99_ms']:.2f} ms, balanced accuracy {stats['balanced_accuracy']:.4f}")
+    if report_path:
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2, default=json_default)
+    return report
+
+
+# ------------------------------
+# Main Function with CLI via argparse
+# ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Shrink a trained forest within a balanced-accuracy budget")
+    parser.add_argument('--members_file', type=str, required=True,
+                        help="Gym members dataset CSV the model was trained on (for the held-out split)")
+    parser.add_argument('--model_dir', type=str, default=DEFAULT_MODEL_DIR, help="Directory holding model versions")
+    parser.add_argument('--model_version', type=str, default=None, help="Model version (default: serving version)")
+    parser.add_argument('--max_accuracy_loss', type=float, default=0.005,
+                        help="Largest allowed drop in held-out balanced accuracy (0.005 = 0.5 points)")
+    parser.add_argument('--output', type=str, default=None,
+                        help="Output directory (default: <model_dir>/<version>/compressed)")
+    parser.add_argument('--report', type=str, default=None, help="Write the before/after report to this JSON file")
+    args = parser.parse_args()
+
+    try:
+        compress_model_version(args.members_file, args.model_dir, args.model_version, args.output,
+                               args.max_accuracy_loss, args.report)
+    except Exception as e:
+        logging.error(f"Compression Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
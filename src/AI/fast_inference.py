@@ -0,0 +1,195 @@
+import math
+
+import numpy as np
+
+# Raw profile fields, in the order expected when a profile is passed as a NumPy row.
+RAW_FIELDS = [
+    'Age', 'Gender', 'Level', 'Weight (kg)', 'Height_m', 'Resting_BPM', 'Fat_Percentage',
+    'Water_Intake (liters)', 'Workout_Frequency (days/week)'
+]
+
+
+# Optional session fields and their per-profile defaults (see engineer_features)
+SESSION_DEFAULTS = {
+    'Calories_Burned': lambda row: 0.0,
+    'Session_Duration (hours)': lambda row: 1.0,
+    'Max_BPM': lambda row: _f(row['Resting_BPM']) + 40,
+}
+
+
+# ------------------------------
+# Helper Functions
+# ------------------------------
+def model_profile(row):
+    """
+    Reduces a profile dict to the fields the model reads: RAW_FIELDS plus the optional
+    session fields, defaulted per profile. Profiles scored together in one DataFrame
+    then cannot affect each other through columns only some of them sent.
+    """
+    missing = [field for field in RAW_FIELDS if field not in row]
+    if missing:
+        raise ValueError(f"Missing profile fields: {', '.join(missing)}")
+    profile = {field: row[field] for field in RAW_FIELDS}
+    for field, default in SESSION_DEFAULTS.items():
+        profile[field] = row[field] if field in row else default(row)
+    return profile
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def engineer_features(row):
+    """
+    Computes the AdvancedFeatureEngineer columns for a single profile dict with scalar
+    float64 math (same formulas, defaults and final fillna(0) as the DataFrame version).
+    """
+    X = dict(row)
+    X.setdefault('Calories_Burned', 0.0)
+    X.setdefault('Session_Duration (hours)', 1.0)
+    if 'Max_BPM' not in X and 'Resting_BPM' in X:
+        X['Max_BPM'] = _f(X['Resting_BPM']) + 40
+    if all(col in X for col in ['Weight (kg)', 'Height_m']):
+        X['BMI'] = _f(X['Weight (kg)']) / (_f(X['Height_m']) ** 2)
+    if all(col in X for col in ['Weight (kg)', 'Height_m', 'Fat_Percentage']):
+        X['FFMI'] = (_f(X['Weight (kg)']) * (1 - _f(X['Fat_Percentage']) / 100)) / (_f(X['Height_m']) ** 2)
+    if all(col in X for col in ['Resting_BPM', 'Age', 'Water_Intake (liters)']):
+        X['Metabolic_Age'] = _f(X['Resting_BPM']) + (_f(X['Age']) * 0.25) - (_f(X['Water_Intake (liters)']) * 2)
+    X['Caloric_Efficiency'] = _f(X['Calories_Burned']) / (_f(X['Session_Duration (hours)']) + 1e-6)
+    if 'Water_Intake (liters)' in X:
+        X['Recovery_Ratio'] = _f(X['Water_Intake (liters)']) / (_f(X['Session_Duration (hours)']) + 1e-6)
+    if all(col in X for col in ['Weight (kg)', 'Fat_Percentage']):
+        X['Lean_Body_Mass'] = _f(X['Weight (kg)']) * (1 - _f(X['Fat_Percentage']) / 100)
+    if all(col in X for col in ['Water_Intake (liters)', 'Weight (kg)']):
+        X['Hydration_Index'] = _f(X['Water_Intake (liters)']) / _f(X['Weight (kg)'])
+    if all(col in X for col in ['Max_BPM', 'Resting_BPM']):
+        X['Cardio_Stress'] = (_f(X['Max_BPM']) - _f(X['Resting_BPM'])) / _f(X['Resting_BPM'])
+    return {key: 0 if _is_missing(value) else value for key, value in X.items()}
+
+
+def _f(value):
+    """float64 scalar, so division by zero gives inf/nan like pandas instead of raising."""
+    return np.float64(np.nan) if _is_missing(value) else np.float64(value)
+
+
+# ------------------------------
+# Single-row Inference
+# ------------------------------
+class RowTransformer:
+    """
+    The fitted preprocessing of a fitness-goal ImbPipeline (feature engineering,
+    imputation, polynomial expansion, scaling, one-hot encoding and feature selection)
+    as plain parameters, replayed on one profile with NumPy array math instead of
+    one-row DataFrames. The feature row is identical to the one the DataFrame path produces.
+    """
+
+    def __init__(self, numeric, categorical, support):
+        self.numeric = numeric
+        self.categorical = categorical
+        self.support = support
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        steps = dict(pipeline.steps)
+        if not all(name in steps for name in ['advanced_features', 'preprocessor', 'feature_selection',
+                                              'classifier']):
+            raise ValueError("RowPredictor only supports the pipeline built by train_fitness_goal_model")
+        numeric = None
+        categorical = None
+        for name, transformer, columns in steps['preprocessor'].transformers_:
+            if name == 'num':
+                numeric = cls._numeric_params(transformer, list(columns))
+            elif name == 'cat':
+                categorical = cls._categorical_params(transformer, list(columns))
+            elif transformer != 'drop':
+                raise ValueError(f"Unsupported preprocessor step: {name}")
+        return cls(numeric, categorical, steps['feature_selection'].get_support())
+
+    @staticmethod
+    def _numeric_params(pipeline, columns):
+        imputer = pipeline.named_steps['imputer']
+        poly = pipeline.named_steps['poly']
+        scaler = pipeline.named_steps['scaler']
+        statistics = imputer.statistics_.astype(np.float64)
+        return {
+            'columns': columns,
+            'statistics': statistics,
+            # SimpleImputer drops columns that were entirely missing during fit
+            'kept': ~np.isnan(statistics) if not imputer.keep_empty_features else np.ones(len(columns), bool),
+            'powers': poly.powers_,
+            'mean': scaler.mean_ if scaler.with_mean else None,
+            'scale': scaler.scale_ if scaler.with_std else None,
+        }
+
+    @staticmethod
+    def _categorical_params(pipeline, columns):
+        imputer = pipeline.named_steps['imputer']
+        encoder = pipeline.named_steps['onehot']
+        return {
+            'columns': columns,
+            'statistics': list(imputer.statistics_),
+            'categories': [{category: i for i, category in enumerate(categories)}
+                           for categories in encoder.categories_],
+            'widths': [len(categories) for categories in encoder.categories_],
+        }
+
+    def transform(self, row):
+        """
+        Returns the selected feature vector for one profile (dict, or NumPy row in RAW_FIELDS order).
+        Raises ValueError if it is not finite.
+        """
+        if not isinstance(row, dict):
+            row = dict(zip(RAW_FIELDS, row))
+        X = engineer_features(row)
+        parts = []
+        if self.numeric is not None:
+            params = self.numeric
+            x = np.array([X[col] for col in params['columns']], dtype=np.float64)
+            x = np.where(np.isnan(x), params['statistics'], x)[params['kept']]
+            x = np.prod(x ** params['powers'], axis=1)
+            if params['mean'] is not None:
+                x = x - params['mean']
+            if params['scale'] is not None:
+                x = x / params['scale']
+            parts.append(x)
+        if self.categorical is not None:
+            params = self.categorical
+            for col, fill, lookup, width in zip(params['columns'], params['statistics'],
+                                                params['categories'], params['widths']):
+                value = X[col]
+                onehot = np.zeros(width)
+                position = lookup.get(fill if _is_missing(value) else value)
+                if position is not None:
+                    onehot[position] = 1.0
+                parts.append(onehot)
+        features = np.concatenate(parts)[self.support]
+        if not np.isfinite(features).all():
+            # the sklearn pipeline rejects these rows too ("Input X contains infinity"), e.g. for Height_m=0
+            raise ValueError("Input contains infinity or a value too large for the model")
+        return features
+
+    def transform_many(self, rows):
+        """Feature matrix for several profiles, one row each."""
+        return np.vstack([self.transform(row) for row in rows])
+
+
+class RowPredictor:
+    """
+    Inference mode for a fitted fitness-goal ImbPipeline: the preprocessing runs through
+    a RowTransformer and the resulting row is handed to the fitted classifier.
+    """
+
+    def __init__(self, pipeline):
+        self.transformer = RowTransformer.from_pipeline(pipeline)
+        self.classifier = pipeline.steps[-1][1]
+        self.classes_ = self.classifier.classes_
+
+    def transform(self, row):
+        return self.transformer.transform(row)
+
+    def predict_proba(self, row):
+        """Class probabilities for one profile, ordered like classes_."""
+        return self.classifier.predict_proba(self.transform(row).reshape(1, -1))[0]
+
+    def predict(self, row):
+        return self.classes_[self.predict_proba(row).argmax()]
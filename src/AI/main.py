@@ -1,15 +1,22 @@
 import argparse
+import copy
+import hashlib
+import itertools
+import json
 import logging
 import os
-import random
+import shutil
 import sys
+import tempfile
+import time
+import warnings
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from joblib import parallel_config
+from threadpoolctl import threadpool_limits
 
-from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.base import BaseEstimator, TransformerMixin, clone
 from sklearn.compose import ColumnTransformer
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.feature_selection import SelectKBest, mutual_info_classif
@@ -22,13 +29,56 @@ from sklearn.preprocessing import StandardScaler, OneHotEncoder, PolynomialFeatu
 from imblearn.over_sampling import SMOTE
 from imblearn.pipeline import Pipeline as ImbPipeline
 
+from model_store import DEFAULT_MODEL_DIR, load_model_artifact
+
 # Optional: Suppress NumPy runtime warnings if desired.
 np.seterr(invalid='ignore')
 
-# Set up logging and global random seed for reproducibility
+# Set up logging and the seed used where a run should be reproducible.
+# Plan generation draws from per-plan generators (see plan_rng), not from global RNG state.
 logging.basicConfig(level=logging.INFO)
-random.seed(42)
 np.random.seed(42)
+RANDOM_SEED = 42
+
+# Bump when plan generation changes, so seeded plans (and cached ones) are regenerated.
+PLAN_VERSION = 1
+
+SETS_BY_LEVEL = {
+    'Beginner': (3, 4),
+    'Intermediate': (3, 5),
+    'Advanced': (4, 6)
+}
+STRENGTH_TYPES = {'strength', 'powerlifting', 'olympic weightlifting', 'strongman', 'plyometrics'}
+STRENGTH_REPS_BY_LEVEL = {
+    'Beginner': (8, 10),
+    'Intermediate': (10, 12),
+    'Advanced': (12, 15)
+}
+OTHER_REPS_BY_LEVEL = {
+    'Beginner': (12, 15),
+    'Intermediate': (15, 18),
+    'Advanced': (18, 22)
+}
+
+
+ALLOWED_BODY_PARTS = [
+    "Abdominals", "Adductors", "Abductors", "Biceps", "Calves", "Chest",
+    "Forearms", "Glutes", "Hamstrings", "Lats", "Lower Back", "Middle Back",
+    "Traps", "Neck", "Quadriceps", "Shoulders", "Triceps", "Full Body"
+]
+
+# Accepted (min, max) of the numeric profile fields, shared by the interactive prompts and batch mode
+PROFILE_RANGES = {
+    'Age': (10, 100),
+    'Weight (kg)': (30, 300),
+    'Height_m': (1.0, 2.5),
+    'Resting_BPM': (30, 120),
+    'Fat_Percentage': (5, 60),
+    'Water_Intake (liters)': (0.5, 10),
+    'Workout_Frequency (days/week)': (0, 7),
+    'Workout_Days': (1, 7),
+    'Exercises_Per_Day': (1, 10),
+}
 
 
 # ------------------------------
@@ -74,38 +124,49 @@ def get_valid_options(prompt, allowed_options):
         print("One or more selections were invalid. Please try again.")
 
 
-def determine_sets(level):
+def expand_focused_body_parts(focused_body_parts):
+    """Expands a "Full Body" selection into every individual body part."""
+    if "Full Body" in [bp.capitalize() for bp in focused_body_parts]:
+        return [bp for bp in ALLOWED_BODY_PARTS if bp.lower() != "full body"]
+    return focused_body_parts
+
+
+def plan_rng(user_id=None, plan_version=None):
     """
-    Determines the number of sets with some random variation based on experience level.
+    Returns a numpy Generator for one plan. With a user_id the stream is derived from
+    (user_id, plan_version), so the same user gets the same plan until PLAN_VERSION changes;
+    without one it is seeded from fresh OS entropy. Each request gets its own generator,
+    so concurrent requests never share RNG state.
     """
-    mapping = {
-        'Beginner': (3, 4),
-        'Intermediate': (3, 5),
-        'Advanced': (4, 6)
-    }
-    low, high = mapping.get(level, (3, 4))
-    return random.randint(low, high)
+    if user_id is None:
+        return np.random.default_rng()
+    plan_version = PLAN_VERSION if plan_version is None else plan_version
+    digest = hashlib.sha256(f"{user_id}:{plan_version}".encode('utf-8')).digest()
+    return np.random.default_rng(int.from_bytes(digest[:8], 'little'))
 
 
-def determine_reps(level, exercise_type):
+def prescribe_sets_reps(levels, exercise_types, rng):
     """
-    Determines the number of reps with some random variation based on experience level and exercise type.
-    For strength/power based exercises, the rep range is slightly lower.
+    Draws sets and reps by experience level (strength/power exercises get slightly lower
+    rep ranges) for every exercise in one pass. levels may be a single level or an array aligned with exercise_types.
+    Returns two int arrays.
     """
-    if exercise_type.lower() in ['strength', 'powerlifting', 'olympic weightlifting', 'strongman', 'plyometrics']:
-        mapping = {
-            'Beginner': (8, 10),
-            'Intermediate': (10, 12),
-            'Advanced': (12, 15)
-        }
-    else:
-        mapping = {
-            'Beginner': (12, 15),
-            'Intermediate': (15, 18),
-            'Advanced': (18, 22)
-        }
-    low, high = mapping.get(level, (10, 15))
-    return random.randint(low, high)
+    exercise_types = np.asarray(exercise_types, dtype=object).astype(str)
+    levels = np.broadcast_to(np.asarray(levels, dtype=object).astype(str), exercise_types.shape)
+    # Look the ranges up once per distinct level/type, then gather them for every exercise
+    unique_types, type_codes = np.unique(exercise_types, return_inverse=True)
+    unique_levels, level_codes = np.unique(levels, return_inverse=True)
+    is_strength = np.array([t.lower() in STRENGTH_TYPES for t in unique_types], dtype=bool)[type_codes]
+    set_bounds = np.array([SETS_BY_LEVEL.get(level, (3, 4)) for level in unique_levels],
+                          dtype=np.int64).reshape(-1, 2)[level_codes]
+    strength_bounds = np.array([STRENGTH_REPS_BY_LEVEL.get(level, (10, 15)) for level in unique_levels],
+                               dtype=np.int64).reshape(-1, 2)[level_codes]
+    other_bounds = np.array([OTHER_REPS_BY_LEVEL.get(level, (10, 15)) for level in unique_levels],
+                            dtype=np.int64).reshape(-1, 2)[level_codes]
+    rep_bounds = np.where(is_strength[:, None], strength_bounds, other_bounds)
+    sets = rng.integers(set_bounds[:, 0], set_bounds[:, 1] + 1)
+    reps = rng.integers(rep_bounds[:, 0], rep_bounds[:, 1] + 1)
+    return sets, reps
 
 
 # ------------------------------
@@ -155,6 +216,10 @@ class AdvancedFeatureEngineer(BaseEstimator, TransformerMixin):
             X['Hydration_Index'] = X['Water_Intake (liters)'] / X['Weight (kg)']
         if all(col in X.columns for col in ['Max_BPM', 'Resting_BPM']):
             X['Cardio_Stress'] = (X['Max_BPM'] - X['Resting_BPM']) / X['Resting_BPM']
+        # pandas string columns reject a 0 fill; as object columns a missing category becomes 0,
+        # which the encoder treats as unknown (as engineer_features does for single rows)
+        text_columns = X.select_dtypes(include=['object', 'string']).columns
+        X[text_columns] = X[text_columns].astype(object)
         X.fillna(0, inplace=True)
         return X
 
@@ -162,48 +227,81 @@ class AdvancedFeatureEngineer(BaseEstimator, TransformerMixin):
 # ------------------------------
 # Data Loading Function
 # ------------------------------
-def load_and_merge_datasets(file1, file2):
-    """Loads and merges two datasets after cleaning and basic feature engineering."""
-    if not os.path.exists(file1) or not os.path.exists(file2):
-        raise FileNotFoundError("Dataset files not found. Check file paths.")
-    try:
-        df_members = pd.read_csv(file1)
-        df_exercises = pd.read_csv(file2)
-    except Exception as e:
-        raise ValueError(f"Error loading datasets: {str(e)}")
-    df_exercises = df_exercises.drop(columns=["Unnamed: 0", "Desc", "Rating", "RatingDesc"], errors='ignore')
-    if 'Type' in df_exercises.columns:
-        df_exercises['Type'] = df_exercises['Type'].str.replace(' ', '_').str.title()
+def clean_members_dataset(df_members):
+    """Renames the member columns to the exercise dataset's naming and maps the level/type codes."""
     df_members = df_members.rename(columns={
         "Workout_Type": "Type",
         "Experience_Level": "Level",
         "Height (m)": "Height_m"
     })
     df_members['Level'] = df_members['Level'].astype(str)
-    if 'Level' in df_exercises.columns:
-        df_exercises['Level'] = df_exercises['Level'].astype(str)
     df_members['Level'] = df_members['Level'].replace({'1': 'Beginner', '2': 'Intermediate', '3': 'Advanced'})
     df_members['Type'] = df_members['Type'].replace({
         'HIIT': 'High_Intensity',
         'Yoga': 'Flexibility',
         'Strength': 'Strength'
     })
-    merged_df = pd.merge(df_members, df_exercises,
-                         on=["Type", "Level"],
-                         how="inner",
-                         validate="many_to_many")
-    return merged_df, df_members
+    return df_members
+
+
+def load_members_dataset(file1):
+    """Loads and cleans the gym members dataset on its own (all the model needs for training)."""
+    if not os.path.exists(file1):
+        raise FileNotFoundError("Members dataset file not found. Check file path.")
+    try:
+        df_members = pd.read_csv(file1)
+    except Exception as e:
+        raise ValueError(f"Error loading members dataset: {str(e)}")
+    return clean_members_dataset(df_members)
+
+
+def clean_exercises_dataset(df_exercises):
+    """Drops the unused exercise columns and normalizes the Type and Level values."""
+    df_exercises = df_exercises.drop(columns=["Unnamed: 0", "Desc", "Rating", "RatingDesc"], errors='ignore')
+    if 'Type' in df_exercises.columns:
+        df_exercises['Type'] = df_exercises['Type'].str.replace(' ', '_').str.title()
+    if 'Level' in df_exercises.columns:
+        df_exercises['Level'] = df_exercises['Level'].astype(str)
+    return df_exercises
+
+
+def build_exercise_catalog(df_exercises, df_members):
+    """
+    Builds the compact exercise catalog used for plan generation: one row per exercise
+    whose (Type, Level) occurs in the members data (the same exercises the inner merge
+    keeps), without member columns and with categorical Type/BodyPart/Equipment/Level.
+    Its size depends only on the exercise dataset, not on the number of members.
+    """
+    member_keys = pd.MultiIndex.from_frame(df_members[["Type", "Level"]].drop_duplicates())
+    in_members = pd.MultiIndex.from_frame(df_exercises[["Type", "Level"]]).isin(member_keys)
+    catalog = df_exercises[in_members].drop_duplicates().reset_index(drop=True)
+    for col in ["Type", "BodyPart", "Equipment", "Level"]:
+        if col in catalog.columns:
+            catalog[col] = catalog[col].astype('category')
+    return catalog
+
+
+def load_datasets(file1, file2):
+    """Loads the cleaned members dataset and the compact exercise catalog built from both files."""
+    if not os.path.exists(file1) or not os.path.exists(file2):
+        raise FileNotFoundError("Dataset files not found. Check file paths.")
+    try:
+        df_members = pd.read_csv(file1)
+        df_exercises = pd.read_csv(file2)
+    except Exception as e:
+        raise ValueError(f"Error loading datasets: {str(e)}")
+    df_members = clean_members_dataset(df_members)
+    catalog = build_exercise_catalog(clean_exercises_dataset(df_exercises), df_members)
+    logging.info(f"Exercise catalog: {len(catalog)} exercises, "
+                 f"{catalog.memory_usage(deep=True).sum() / 1024:.0f} KiB")
+    return catalog, df_members
 
 
 # ------------------------------
 # Model Training Function
 # ------------------------------
-def train_fitness_goal_model(df):
-    """
-    Trains a RandomForest model with hyperparameter tuning using advanced features.
-    The target "Fitness_Goal" is computed based on BMI and Fat_Percentage.
-    """
-    df_temp = AdvancedFeatureEngineer().transform(df.copy())
+def label_fitness_goal(df_temp):
+    """Computes the "Fitness_Goal" training target from BMI and Fat_Percentage of engineered rows."""
     conditions = [
         (df_temp['BMI'] < 18.5),
         (df_temp['BMI'] >= 18.5) & (df_temp['BMI'] < 24.9),
@@ -211,7 +309,86 @@ def train_fitness_goal_model(df):
         (df_temp['BMI'] >= 24.9) & (df_temp['Fat_Percentage'] <= 20)
     ]
     choices = ['Muscle_Gain', 'General_Fitness', 'Fat_Loss', 'General_Fitness']
-    df_temp['Fitness_Goal'] = np.select(conditions, choices, default='General_Fitness')
+    return np.select(conditions, choices, default='General_Fitness')
+
+
+def rule_fitness_goal(user_data):
+    """
+    Applies label_fitness_goal to a single profile straight from its raw fields, without
+    the model. Returns None when Weight, Height or Fat_Percentage is missing or unusable.
+    """
+    try:
+        weight, height, fat = (float(user_data[field]) for field in ['Weight (kg)', 'Height_m', 'Fat_Percentage'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if np.isnan([weight, height, fat]).any() or height <= 0:
+        return None
+    return str(label_fitness_goal({'BMI': weight / height ** 2, 'Fat_Percentage': fat}))
+
+
+def fitness_goal_split(df):
+    """Labels the member rows and returns the stratified (X_train, X_test, y_train, y_test) split used in training."""
+    y = pd.Series(label_fitness_goal(AdvancedFeatureEngineer().transform(df.copy())), index=df.index,
+                  name='Fitness_Goal')
+    return train_test_split(df.copy(), y, test_size=0.2, random_state=42, stratify=y)
+
+
+# joblib backends for the parallel candidate fits. loky caps BLAS/OpenMP threads in its workers and
+# threading runs in this process; multiprocessing workers would run with unlimited BLAS threads.
+TRAINING_BACKENDS = ('loky', 'threading')
+
+
+def split_cpu_budget(cpu_budget=None, inner_jobs=1):
+    """
+    Splits a CPU budget into (outer_jobs, inner_jobs): outer_jobs parallel candidate fits,
+    each allowed inner_jobs threads for the forest and BLAS, so that at most
+    outer_jobs * inner_jobs cores are busy. cpu_budget defaults to every core.
+    """
+    cpu_budget = cpu_budget or os.cpu_count() or 1
+    inner_jobs = max(1, min(inner_jobs, cpu_budget))
+    return max(1, cpu_budget // inner_jobs), inner_jobs
+
+
+def log_candidate_fit_times(cv_results):
+    """Logs mean fit/score time and score for every candidate of a finished search."""
+    n_resources = cv_results.get('n_resources')
+    for i, params in enumerate(cv_results['params']):
+        resources = f" n_estimators={n_resources[i]}" if n_resources is not None else ''
+        logging.info(f"Candidate {i}:{resources} fit {cv_results['mean_fit_time'][i]:.2f}s "
+                     f"(+/- {cv_results['std_fit_time'][i]:.2f}s), score {cv_results['mean_score_time'][i]:.2f}s, "
+                     f"balanced accuracy {cv_results['mean_test_score'][i]:.3f}  {params}")
+
+
+def build_hyperparameter_search(pipeline, param_dist, search_strategy='random', n_jobs=-1):
+    """
+    Returns the hyperparameter search for search_strategy, running n_jobs candidate fits at once:
+      - 'random': RandomizedSearchCV, 50 candidates x 3 folds, each fitted with every tree.
+      - 'halving': successive halving over the same candidates with the number of trees as
+        the budget (50 -> 150 -> 450), so losing configurations are dropped after small forests.
+    """
+    if search_strategy == 'random':
+        return RandomizedSearchCV(
+            pipeline, param_dist, n_iter=50, cv=3,
+            scoring='balanced_accuracy', n_jobs=n_jobs, verbose=2, random_state=42
+        )
+    if search_strategy == 'halving':
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables the import below)
+        from sklearn.model_selection import HalvingRandomSearchCV
+        param_dist = {k: v for k, v in param_dist.items() if k != 'classifier__n_estimators'}
+        return HalvingRandomSearchCV(
+            pipeline, param_dist, n_candidates=50, cv=3, factor=3,
+            resource='classifier__n_estimators', min_resources=50, max_resources=500,
+            scoring='balanced_accuracy', n_jobs=n_jobs, verbose=2, random_state=42
+        )
+    raise ValueError(f"Unknown search strategy: {search_strategy}")
+
+
+def build_fitness_goal_pipeline(df, inner_jobs=1):
+    """
+    Returns the unfitted fitness-goal pipeline (feature engineering, preprocessing, feature
+    selection, SMOTE and the random forest) and the features it uses, given the member rows.
+    """
+    df_temp = AdvancedFeatureEngineer().transform(df.copy())
     all_features = [
         'Age', 'Gender', 'BMI', 'FFMI', 'Resting_BPM', 'Workout_Frequency (days/week)',
         'Level', 'Fat_Percentage', 'Water_Intake (liters)', 'Caloric_Efficiency',
@@ -237,13 +414,35 @@ def train_fitness_goal_model(df):
         ('preprocessor', preprocessor),
         ('feature_selection', SelectKBest(mutual_info_classif, k=min(20, len(features)))),
         ('smote', SMOTE(sampling_strategy='not majority', random_state=42)),
-        ('classifier', RandomForestClassifier(class_weight='balanced', random_state=42))
+        ('classifier', RandomForestClassifier(class_weight='balanced', random_state=42, n_jobs=inner_jobs))
     ])
-    X = df.copy()
-    y = df_temp['Fitness_Goal']
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    return pipeline, features
+
+
+def train_fitness_goal_model(df, return_report=False, search_strategy='random', cache_dir=None,
+                             cpu_budget=None, inner_jobs=1, backend='loky'):
+    """
+    Trains a RandomForest model with hyperparameter tuning using advanced features.
+    The target "Fitness_Goal" is computed based on BMI and Fat_Percentage.
+    With return_report=True, also returns the search results (best params, scores, features).
+
+    search_strategy is 'random' or 'halving' (see build_hyperparameter_search). With a
+    cache_dir (a temporary one is used for 'halving'), the fitted preprocessing stages are
+    cached per fold and parameter setting, so candidates sharing them do not refit them.
+
+    cpu_budget caps the cores the search uses (see split_cpu_budget): candidate fits run in
+    parallel on the joblib backend, each forest with inner_jobs threads and BLAS limited to
+    inner_jobs threads, so training can share a machine with the serving processes.
+    backend is one of TRAINING_BACKENDS, the joblib backends that can enforce that limit.
+    """
+    if backend not in TRAINING_BACKENDS:
+        raise ValueError(f"Unsupported backend {backend!r}; use one of {', '.join(TRAINING_BACKENDS)}")
+    pipeline, features = build_fitness_goal_pipeline(df, inner_jobs)
+    tmp_cache_dir = None
+    if cache_dir is None and search_strategy == 'halving':
+        cache_dir = tmp_cache_dir = tempfile.mkdtemp(prefix='fytai-pipeline-cache-')
+    pipeline.set_params(memory=cache_dir)
+    X_train, X_test, y_train, y_test = fitness_goal_split(df)
     param_dist = {
         'classifier__n_estimators': np.arange(100, 501, 100),
         'classifier__max_depth': [None, 10, 20, 30],
@@ -253,52 +452,142 @@ def train_fitness_goal_model(df):
         'preprocessor__num__poly__degree': [1, 2],
         'smote__k_neighbors': [3, 5, 7]
     }
-    search = RandomizedSearchCV(
-        pipeline, param_dist, n_iter=50, cv=3,
-        scoring='balanced_accuracy', n_jobs=-1, verbose=2, random_state=42
-    )
-    search.fit(X_train, y_train)
+    outer_jobs, inner_jobs = split_cpu_budget(cpu_budget, inner_jobs)
+    pipeline.set_params(classifier__n_jobs=inner_jobs)
+    logging.info(f"CPU budget: {outer_jobs} parallel fits x {inner_jobs} thread(s) each ({backend} backend)")
+    search = build_hyperparameter_search(pipeline, param_dist, search_strategy, n_jobs=outer_jobs)
+    # inner_max_num_threads limits BLAS/OpenMP threads in loky workers; threadpool_limits does
+    # the same in this process (the threading backend and the final refit run here)
+    inner_limits = {'inner_max_num_threads': inner_jobs} if backend == 'loky' else {}
+    search_start = time.perf_counter()
+    try:
+        with parallel_config(backend=backend, **inner_limits), threadpool_limits(limits=inner_jobs):
+            search.fit(X_train, y_train)
+    finally:
+        if tmp_cache_dir:
+            shutil.rmtree(tmp_cache_dir, ignore_errors=True)
+    search_seconds = time.perf_counter() - search_start
     best_model = search.best_estimator_
+    # the cache and thread count are training-time details, not part of the artifact
+    best_model.set_params(memory=None, classifier__n_jobs=None)
+    log_candidate_fit_times(search.cv_results_)
+    logging.info(f"Search ({search_strategy}) took {search_seconds:.1f}s")
     logging.info(f"Best Parameters: {search.best_params_}")
     logging.info(f"Validation Accuracy: {search.best_score_:.3f}")
     y_pred = best_model.predict(X_test)
-    logging.info(f"Test Balanced Accuracy: {balanced_accuracy_score(y_test, y_pred):.3f}")
-    plot_feature_importances(best_model)
+    test_score = balanced_accuracy_score(y_test, y_pred)
+    logging.info(f"Test Balanced Accuracy: {test_score:.3f}")
+    if return_report:
+        return best_model, {
+            'search_strategy': search_strategy,
+            'search_seconds': search_seconds,
+            'cpu_budget': outer_jobs * inner_jobs,
+            'outer_jobs': outer_jobs,
+            'inner_jobs': inner_jobs,
+            'backend': backend,
+            'candidate_fit_seconds': float(np.sum(search.cv_results_['mean_fit_time']) * search.n_splits_),
+            'best_params': search.best_params_,
+            'cv_balanced_accuracy': float(search.best_score_),
+            'test_balanced_accuracy': float(test_score),
+            'features': features,
+            'classes': list(best_model.classes_)
+        }
     return best_model
 
 
+def update_fitness_goal_model(model, df_new, n_new_trees=50, max_estimators=None):
+    """
+    Incrementally updates a trained pipeline with new member rows, without a search.
+    The fitted preprocessing stays frozen; n_new_trees trees are grown on the (SMOTE
+    balanced) new rows and added to a copy of the forest. With max_estimators, the
+    oldest trees are dropped so the forest never grows beyond that size.
+    Returns the updated copy; model itself is left untouched.
+    """
+    df_temp = AdvancedFeatureEngineer().transform(df_new.copy())
+    y_new = label_fitness_goal(df_temp)
+    classes, counts = np.unique(y_new, return_counts=True)
+    if set(classes) != set(model.classes_):
+        raise ValueError(f"New rows cover classes {sorted(classes)}, the model needs {sorted(model.classes_)}. "
+                         "Include older rows of the missing classes in the update.")
+    updated = copy.deepcopy(model)
+    Xt = df_new.copy()
+    for name, step in updated.steps[:-1]:
+        if hasattr(step, 'fit_resample'):
+            continue  # samplers only act at fit time
+        Xt = step.transform(Xt)
+    smote = updated.named_steps.get('smote')
+    if smote is not None and counts.min() > 1:
+        delta_smote = clone(smote).set_params(k_neighbors=min(smote.k_neighbors, counts.min() - 1))
+        Xt, y_new = delta_smote.fit_resample(Xt, y_new)
+    forest = updated.named_steps['classifier']
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + n_new_trees)
+    with warnings.catch_warnings():
+        # "balanced" weights are estimated on the delta only, which is what the new trees should see
+        warnings.filterwarnings('ignore', message='class_weight presets', category=UserWarning)
+        forest.fit(Xt, y_new)
+    forest.set_params(warm_start=False)
+    if max_estimators and len(forest.estimators_) > max_estimators:
+        forest.estimators_ = forest.estimators_[-max_estimators:]
+        forest.set_params(n_estimators=max_estimators)
+    logging.info(f"Added {n_new_trees} trees on {len(df_new)} new rows; forest now has {len(forest.estimators_)}")
+    return updated
+
+
 # ------------------------------
-# Plotting Function
+# Exercise Index
 # ------------------------------
-def plot_feature_importances(model):
-    """Visualizes the top 20 feature importances."""
-    try:
-        all_feature_names = model.named_steps['preprocessor'].get_feature_names_out()
-        mask = model.named_steps['feature_selection'].get_support()
-        selected_feature_names = all_feature_names[mask]
-    except Exception as e:
-        logging.warning(f"Could not retrieve feature names properly: {e}")
-        selected_feature_names = [f"Feature_{i}" for i in
-                                  range(len(model.named_steps['classifier'].feature_importances_))]
-    importances = model.named_steps['classifier'].feature_importances_
-    importance_df = pd.DataFrame({
-        'Feature': selected_feature_names,
-        'Importance': importances
-    }).sort_values('Importance', ascending=False)
-    plt.figure(figsize=(12, 8))
-    sns.barplot(x='Importance', y='Feature', data=importance_df.head(20))
-    plt.title('Top 20 Feature Importances')
-    plt.tight_layout()
-    plt.show()
+class ExerciseIndex:
+    """
+    Maps normalized (Type, BodyPart, Level) values, and every partial combination of
+    them, to the row positions of the matching exercises. Built once when the exercise
+    data is loaded so that plan generation never has to scan a column.
+    """
+    KEYS = ('Type', 'BodyPart', 'Level')
+
+    def __init__(self, df):
+        # Plain object arrays of the columns a plan entry needs, for cheap per-row access
+        self.titles = df['Title'].to_numpy(dtype=object)
+        self.types = df['Type'].to_numpy(dtype=object)
+        self.body_parts = df['BodyPart'].to_numpy(dtype=object)
+        normalized = pd.DataFrame({col: df[col].astype(str).str.strip().str.lower().to_numpy()
+                                   for col in self.KEYS})
+        self._positions = {(None, None, None): np.arange(len(df))}
+        for used in itertools.product([False, True], repeat=len(self.KEYS)):
+            cols = [col for col, use in zip(self.KEYS, used) if use]
+            if not cols:
+                continue
+            for values, positions in normalized.groupby(cols, sort=False).indices.items():
+                values = iter(values if isinstance(values, tuple) else (values,))
+                self._positions[tuple(next(values) if use else None for use in used)] = positions
+
+    @staticmethod
+    def _normalize(value):
+        return None if value is None else str(value).strip().lower()
+
+    def positions(self, exercise_type=None, body_part=None, level=None):
+        """Returns the row positions matching every given (case-insensitive) value."""
+        key = (self._normalize(exercise_type), self._normalize(body_part), self._normalize(level))
+        return self._positions.get(key, np.empty(0, dtype=np.intp))
+
+    def positions_any(self, exercise_types):
+        """Returns the row positions whose Type is any of exercise_types."""
+        return np.concatenate([self.positions(exercise_type=t) for t in exercise_types])
 
 
 # ------------------------------
 # Workout Plan Generation Functions
 # ------------------------------
-def generate_ml_workout_plan(user_data, merged_df, predicted_focus, preferred_workout=None, focused_body_parts=None):
+def generate_ml_workout_plan(user_data, catalog, predicted_focus, preferred_workout=None, focused_body_parts=None,
+                             index=None, rng=None):
     """
     Generates a personalized workout plan based on the model's predicted fitness focus,
     optional preferred workout type, and optionally focused body parts.
+    catalog is the exercise catalog from load_datasets (a merged frame also works); pass a
+    prebuilt ExerciseIndex of it as index to avoid rebuilding the index per plan.
+
+    Exercises are chosen as row positions with rng (a numpy.random.Generator, see
+    plan_rng), sets/reps are drawn for the whole plan at once, and only the final picks
+    are turned into dicts, so no intermediate DataFrames are built.
 
     Modifications for variety and realism include:
       - Mixing primary and secondary exercise types per day.
@@ -323,133 +612,272 @@ def generate_ml_workout_plan(user_data, merged_df, predicted_focus, preferred_wo
     else:
         available_types = expanded_focus_exercise_mapping.get(predicted_focus, ['Cardio', 'Strength', 'Stretching'])
 
+    if index is None:
+        index = ExerciseIndex(catalog)
+    if rng is None:
+        rng = plan_rng()
+    all_positions = index.positions()
     days = user_data['Workout_Days']
     exercises_per_day = user_data['Exercises_Per_Day']
     workout_plan = {}
 
     essential_body_parts = ["Chest", "Back", "Legs", "Shoulders", "Core"]
 
+    def pick_one(pool):
+        return pool[rng.integers(len(pool))]
+
     for day in range(1, days + 1):
         # Choose a primary exercise type and, if possible, a different secondary type
-        primary_type = random.choice(available_types)
+        primary_type = available_types[rng.integers(len(available_types))]
         secondary_options = [t for t in available_types if t.lower() != primary_type.lower()]
-        secondary_type = random.choice(secondary_options) if secondary_options else primary_type
+        secondary_type = secondary_options[rng.integers(len(secondary_options))] if secondary_options else primary_type
 
         # Split the day's exercises into primary and secondary groups
         primary_count = max(1, int(round(exercises_per_day * 0.7)))
         secondary_count = exercises_per_day - primary_count
 
-        # Pools for each type (filtering on type in a case-insensitive way)
-        primary_pool = merged_df[merged_df['Type'].str.lower() == primary_type.lower()]
-        secondary_pool = merged_df[merged_df['Type'].str.lower() == secondary_type.lower()] if secondary_type != primary_type else primary_pool
+        # Pools of row positions for each type (matched case-insensitively by the index)
+        primary_pool = index.positions(exercise_type=primary_type)
+        secondary_pool = index.positions(exercise_type=secondary_type) if secondary_type != primary_type else primary_pool
 
-        # If a pool is empty, fall back to the entire merged dataset
-        if primary_pool.empty:
-            primary_pool = merged_df
-        if secondary_pool.empty:
-            secondary_pool = merged_df
+        # If a pool is empty, fall back to the entire catalog
+        primary_pool_type = primary_type
+        if not len(primary_pool):
+            primary_pool = all_positions
+            primary_pool_type = None
+        if not len(secondary_pool):
+            secondary_pool = all_positions
 
-        selected_exercises = []
+        selected = []
+        taken = np.zeros(len(all_positions), dtype=bool)
 
         # Sample extra exercises from focused body parts (up to one per group) from primary pool
         if focused_body_parts:
             for bp in focused_body_parts:
-                bp_group = primary_pool[primary_pool['BodyPart'].str.lower() == bp.lower()]
-                if not bp_group.empty:
-                    selected_exercises.append(bp_group.sample(n=1))
+                bp_group = index.positions(exercise_type=primary_pool_type, body_part=bp)
+                if len(bp_group):
+                    selected.append(pick_one(bp_group))
+        taken[selected] = True
 
         # Fill the primary count from primary pool, excluding already selected exercises
-        already_selected = pd.concat(selected_exercises).index if selected_exercises else pd.Index([])
-        remaining_primary = primary_pool.drop(index=already_selected, errors='ignore')
-        if remaining_primary.empty:
+        remaining_primary = primary_pool[~taken[primary_pool]]
+        if not len(remaining_primary):
             remaining_primary = primary_pool  # fallback if all have been selected
-        if len(remaining_primary) >= primary_count:
-            primary_selected = remaining_primary.sample(n=primary_count)
-        else:
-            primary_selected = remaining_primary.sample(n=primary_count, replace=True)
-        selected_exercises.append(primary_selected)
+        primary_selected = rng.choice(remaining_primary, size=primary_count,
+                                      replace=len(remaining_primary) < primary_count)
+        selected.extend(primary_selected)
+        taken[primary_selected] = True
 
         # Fill the secondary count from secondary pool, excluding duplicates
-        already_selected = pd.concat(selected_exercises).index if selected_exercises else pd.Index([])
-        remaining_secondary = secondary_pool.drop(index=already_selected, errors='ignore')
-        if remaining_secondary.empty:
+        remaining_secondary = secondary_pool[~taken[secondary_pool]]
+        if not len(remaining_secondary):
             remaining_secondary = secondary_pool  # fallback if empty after exclusion
         if len(remaining_secondary) >= secondary_count:
-            secondary_selected = remaining_secondary.sample(n=secondary_count)
+            secondary_selected = rng.choice(remaining_secondary, size=secondary_count, replace=False)
         else:
-            secondary_selected = secondary_pool.sample(n=secondary_count, replace=True)
-        selected_exercises.append(secondary_selected)
-
-        # Combine selections and ensure we have the required number of exercises
-        daily_exercises = pd.concat(selected_exercises).drop_duplicates().head(exercises_per_day)
-        workout_plan[f'Day {day}'] = [{
-            'Exercise': row['Title'],
-            'Type': row['Type'],
-            'BodyPart': row['BodyPart'],
-            'Sets': determine_sets(user_data['Level']),
-            'Reps': determine_reps(user_data['Level'], row['Type'])
-        } for _, row in daily_exercises.iterrows()]
+            secondary_selected = rng.choice(secondary_pool, size=secondary_count, replace=True)
+        selected.extend(secondary_selected)
+
+        # Combine selections (first occurrence wins) and keep the required number of exercises
+        daily_positions = list(dict.fromkeys(int(p) for p in selected))[:exercises_per_day]
+        workout_plan[f'Day {day}'] = daily_positions
 
         # Ensure essential body parts are covered (if missing, add one exercise per missing group)
-        current_body_parts = {ex['BodyPart'].lower() for ex in workout_plan[f'Day {day}']}
+        current_body_parts = {str(index.body_parts[p]).lower() for p in daily_positions}
         for bp in essential_body_parts:
             if bp.lower() not in current_body_parts:
-                bp_group = merged_df[merged_df['BodyPart'].str.lower() == bp.lower()]
-                if not bp_group.empty:
-                    extra_ex = bp_group.sample(n=1).iloc[0]
-                    workout_plan[f'Day {day}'].append({
-                        'Exercise': extra_ex['Title'],
-                        'Type': extra_ex['Type'],
-                        'BodyPart': extra_ex['BodyPart'],
-                        'Sets': determine_sets(user_data['Level']),
-                        'Reps': determine_reps(user_data['Level'], extra_ex['Type'])
-                    })
+                bp_group = index.positions(body_part=bp)
+                if len(bp_group):
+                    workout_plan[f'Day {day}'].append(int(pick_one(bp_group)))
 
     # Ensure at least one cardio and one stretching exercise are included across the week.
-    all_exercises = [ex for day in workout_plan for ex in workout_plan[day]]
-    types_in_plan = [ex['Type'].lower() for ex in all_exercises]
+    day_keys = list(workout_plan.keys())
+    types_in_plan = {str(index.types[p]).lower() for day in workout_plan for p in workout_plan[day]}
 
     if "cardio" not in types_in_plan:
-        cardio_ex = merged_df[merged_df['Type'].str.lower() == "cardio"]
-        if not cardio_ex.empty:
-            replacement = cardio_ex.sample(n=1).iloc[0]
-            random_day = random.choice(list(workout_plan.keys()))
-            workout_plan[random_day].insert(0, {
-                'Exercise': replacement['Title'],
-                'Type': replacement['Type'],
-                'BodyPart': replacement['BodyPart'],
-                'Sets': determine_sets(user_data['Level']),
-                'Reps': determine_reps(user_data['Level'], replacement['Type'])
-            })
+        cardio_ex = index.positions(exercise_type="cardio")
+        if len(cardio_ex):
+            replacement = pick_one(cardio_ex)
+            random_day = day_keys[rng.integers(len(day_keys))]
+            workout_plan[random_day].insert(0, int(replacement))
 
     if "stretching" not in types_in_plan:
-        stretch_ex = merged_df[merged_df['Type'].str.lower() == "stretching"]
-        if not stretch_ex.empty:
-            random_day = random.choice(list(workout_plan.keys()))
-            sampled = stretch_ex.sample(n=1).iloc[0]
-            workout_plan[random_day].insert(1, {
-                'Exercise': sampled['Title'],
-                'Type': sampled['Type'],
-                'BodyPart': sampled['BodyPart'],
-                'Sets': determine_sets(user_data['Level']),
-                'Reps': determine_reps(user_data['Level'], sampled['Type'])
-            })
+        stretch_ex = index.positions(exercise_type="stretching")
+        if len(stretch_ex):
+            random_day = day_keys[rng.integers(len(day_keys))]
+            workout_plan[random_day].insert(1, int(pick_one(stretch_ex)))
 
     bmi = user_data['Weight (kg)'] / (user_data['Height_m'] ** 2)
     if bmi >= 25 or predicted_focus == "Fat_Loss":
-        hiit_ex = merged_df[merged_df['Type'].str.lower().isin(["hiit", "cardio"])]
-        if not hiit_ex.empty:
-            extra = hiit_ex.sample(n=1).iloc[0]
+        hiit_ex = index.positions_any(["hiit", "cardio"])
+        if len(hiit_ex):
+            extra = pick_one(hiit_ex)
             # Choose a random day to add the extra HIIT exercise (if that day exists)
-            day_key = random.choice(list(workout_plan.keys()))
-            workout_plan[day_key].append({
-                'Exercise': extra['Title'],
-                'Type': extra['Type'],
-                'BodyPart': extra['BodyPart'],
-                'Sets': determine_sets(user_data['Level']),
-                'Reps': determine_reps(user_data['Level'], extra['Type'])
-            })
-    return workout_plan
+            day_key = day_keys[rng.integers(len(day_keys))]
+            workout_plan[day_key].append(int(extra))
+
+    # Prescribe sets and reps for the whole plan in one vectorized pass
+    chosen = np.fromiter(itertools.chain.from_iterable(workout_plan.values()), dtype=np.intp)
+    sets, reps = prescribe_sets_reps(user_data['Level'], index.types[chosen], rng)
+    entries = iter(zip(chosen.tolist(), sets.tolist(), reps.tolist()))
+    return {day: [{
+        'Exercise': index.titles[position],
+        'Type': index.types[position],
+        'BodyPart': index.body_parts[position],
+        'Sets': n_sets,
+        'Reps': n_reps
+    } for position, n_sets, n_reps in itertools.islice(entries, len(positions))]
+        for day, positions in workout_plan.items()}
+
+
+# ------------------------------
+# Batch Mode (JSON/NDJSON in, NDJSON out)
+# ------------------------------
+BATCH_CHUNK_SIZE = 1000
+
+
+def _decode_values(decoder, text):
+    """
+    Decodes the whitespace-separated JSON values in text. Returns (values, rest): rest is
+    an object still open at the end of text; malformed input becomes a JSONDecodeError
+    entry in values and ends the decoding.
+    """
+    values, position = [], 0
+    while True:
+        while position < len(text) and text[position].isspace():
+            position += 1
+        if position == len(text):
+            return values, ''
+        try:
+            value, position = decoder.raw_decode(text, position)
+        except json.JSONDecodeError as e:
+            if text[position] == '{' and e.pos >= len(text.rstrip()):
+                return values, text[position:]  # object continues on the next line
+            values.append(e)
+            return values, ''
+        values.append(value)
+
+
+def read_profiles(stream):
+    """
+    Yields user profiles from a stream holding either a JSON array, a single JSON
+    object, or NDJSON (one object per line; pretty-printed objects are also accepted).
+    Lines that cannot be decoded, or an array that cannot be decoded as a whole, yield
+    an exception in place of the profile.
+    """
+    decoder = json.JSONDecoder()
+    first_line = stream.readline()
+    while first_line and not first_line.strip():
+        first_line = stream.readline()  # sniff the format from the first non-blank line
+    if first_line.lstrip().startswith('['):
+        try:
+            profiles = json.loads(first_line + stream.read())
+        except json.JSONDecodeError as e:
+            yield ValueError(f"Malformed JSON array: {e}")
+            return
+        yield from profiles
+        return
+    pending = ''
+    for line in itertools.chain([first_line], stream):
+        values, rest = _decode_values(decoder, pending + line)
+        if pending and any(isinstance(value, json.JSONDecodeError) for value in values):
+            # The object buffered from earlier lines was malformed; report it and read this line on its own
+            yield ValueError(f"Malformed JSON profile: {pending.strip()[:80]}")
+            values, rest = _decode_values(decoder, line)
+        yield from values
+        pending = rest
+    if pending.strip():
+        yield ValueError(f"Truncated JSON profile: {pending.strip()[:80]}")
+
+
+def profile_to_user_data(profile):
+    """
+    Normalizes a batch profile into the user_data dict collected by the interactive prompts,
+    with the same value ranges (see PROFILE_RANGES).
+    """
+    user_data = {
+        'Age': int(profile['Age']),
+        'Gender': str(profile['Gender']).strip().capitalize(),
+        'Level': str(profile['Level']).strip().strip('\'"').capitalize(),
+        'Weight (kg)': float(profile['Weight (kg)']),
+        'Height_m': float(profile['Height_m']),
+        'Resting_BPM': int(profile['Resting_BPM']),
+        'Fat_Percentage': float(profile['Fat_Percentage']),
+        'Water_Intake (liters)': float(profile['Water_Intake (liters)']),
+        'Workout_Frequency (days/week)': int(profile['Workout_Frequency (days/week)']),
+        'Workout_Days': int(profile['Workout_Days']),
+        'Exercises_Per_Day': int(profile['Exercises_Per_Day'])
+    }
+    for field, (low, high) in PROFILE_RANGES.items():
+        if not low <= user_data[field] <= high:
+            raise ValueError(f"{field} must be between {low} and {high}")
+    preferred_workout = profile.get('Preferred_Workout') or "Mixed"
+    focused_body_parts = profile.get('Focused_Body_Parts') or []
+    if isinstance(focused_body_parts, str):
+        focused_body_parts = [bp.strip() for bp in focused_body_parts.split(',') if bp.strip()]
+    return user_data, preferred_workout, expand_focused_body_parts(focused_body_parts)
+
+
+def generate_plans_for_profiles(profiles, model, catalog):
+    """
+    Yields one structured result per profile, in input order. Profiles are scored in
+    chunks with a single predict_proba call each; invalid profiles (and profiles whose
+    plan cannot be generated) yield an "error" entry.
+    """
+    profiles = iter(profiles)
+    index = ExerciseIndex(catalog)
+    rng = np.random.default_rng(RANDOM_SEED)
+    while True:
+        chunk = [p for _, p in zip(range(BATCH_CHUNK_SIZE), profiles)]
+        if not chunk:
+            return
+        parsed = []
+        for profile in chunk:
+            if isinstance(profile, Exception):
+                parsed.append(profile)  # undecodable input line
+                continue
+            try:
+                parsed.append(profile_to_user_data(profile))
+            except (KeyError, TypeError, ValueError) as e:
+                parsed.append(e)
+        valid = [p for p in parsed if not isinstance(p, Exception)]
+        if valid:
+            probabilities = model.predict_proba(pd.DataFrame([user_data for user_data, _, _ in valid]))
+        valid_rows = iter(range(len(valid)))
+        for profile, entry in zip(chunk, parsed):
+            result = {'id': profile.get('id') if isinstance(profile, dict) else None}
+            if isinstance(entry, Exception):
+                result['error'] = f"Invalid profile: {entry!r}"
+                yield result
+                continue
+            user_data, preferred_workout, focused_body_parts = entry
+            row = probabilities[next(valid_rows)]
+            prediction = model.classes_[row.argmax()]
+            try:
+                workout_plan = generate_ml_workout_plan(
+                    user_data, catalog, prediction,
+                    preferred_workout if preferred_workout != "Mixed" else None,
+                    focused_body_parts, index=index,
+                    rng=plan_rng(result['id']) if result['id'] is not None else rng)
+            except Exception as e:
+                result['error'] = f"Plan generation failed: {e!r}"
+                yield result
+                continue
+            result['prediction'] = prediction
+            result['probabilities'] = {cls: float(p) for cls, p in zip(model.classes_, row)}
+            result['workout_plan'] = workout_plan
+            yield result
+
+
+def run_batch(batch_path, model, catalog, output=sys.stdout):
+    """Reads profiles from batch_path ('-' for stdin) and writes one JSON plan per line."""
+    stream = sys.stdin if batch_path == '-' else open(batch_path)
+    try:
+        for result in generate_plans_for_profiles(read_profiles(stream), model, catalog):
+            output.write(json.dumps(result) + '\n')
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
 
 
 # ------------------------------
@@ -459,43 +887,52 @@ def main():
     parser = argparse.ArgumentParser(description="AI-Powered Workout Planner with Advanced ML Integration")
     parser.add_argument('--members_file', type=str, required=True, help="Path to the gym members dataset CSV")
     parser.add_argument('--exercises_file', type=str, required=True, help="Path to the exercises dataset CSV")
+    parser.add_argument('--model_dir', type=str, default=DEFAULT_MODEL_DIR,
+                        help="Directory of trained model versions (see train.py)")
+    parser.add_argument('--model_version', type=str, default=None,
+                        help="Model version to use (default: newest compatible)")
+    parser.add_argument('--batch', type=str, default=None, metavar='PATH',
+                        help="Non-interactive mode: read JSON/NDJSON profiles from PATH ('-' for stdin) "
+                             "and write one JSON plan per line to stdout")
     args = parser.parse_args()
 
-    logging.info("Loading and merging datasets...")
+    logging.info("Loading datasets...")
     try:
-        merged_df, df_members = load_and_merge_datasets(args.members_file, args.exercises_file)
-        model = train_fitness_goal_model(df_members)
+        catalog, df_members = load_datasets(args.members_file, args.exercises_file)
+        model, _ = load_model_artifact(args.model_dir, args.model_version)
     except Exception as e:
         logging.error(f"Initialization Error: {e}")
         sys.exit(1)
 
+    if args.batch:
+        run_batch(args.batch, model, catalog)
+        return
+
     print("\nPlease provide your fitness information:")
     try:
         user_data = {
-            'Age': get_valid_input("Age: ", int, valid_range=(10, 100)),
+            'Age': get_valid_input("Age: ", int, valid_range=PROFILE_RANGES['Age']),
             'Gender': input("Gender (Male/Female/Other): ").strip().capitalize(),
             'Level': input("Experience Level (Beginner/Intermediate/Advanced): ").strip().strip('\'"').capitalize(),
-            'Weight (kg)': get_valid_input("Weight (kg): ", float, valid_range=(30, 300)),
-            'Height_m': get_valid_input("Height (m): ", float, valid_range=(1.0, 2.5)),
-            'Resting_BPM': get_valid_input("Resting Heart Rate (BPM): ", int, valid_range=(30, 120)),
-            'Fat_Percentage': get_valid_input("Body Fat Percentage: ", float, valid_range=(5, 60)),
-            'Water_Intake (liters)': get_valid_input("Daily Water Intake (liters): ", float, valid_range=(0.5, 10)),
+            'Weight (kg)': get_valid_input("Weight (kg): ", float, valid_range=PROFILE_RANGES['Weight (kg)']),
+            'Height_m': get_valid_input("Height (m): ", float, valid_range=PROFILE_RANGES['Height_m']),
+            'Resting_BPM': get_valid_input("Resting Heart Rate (BPM): ", int,
+                                           valid_range=PROFILE_RANGES['Resting_BPM']),
+            'Fat_Percentage': get_valid_input("Body Fat Percentage: ", float,
+                                              valid_range=PROFILE_RANGES['Fat_Percentage']),
+            'Water_Intake (liters)': get_valid_input("Daily Water Intake (liters): ", float,
+                                                     valid_range=PROFILE_RANGES['Water_Intake (liters)']),
             'Workout_Frequency (days/week)': get_valid_input("Current Workout Frequency (days/week): ", int,
-                                                             valid_range=(0, 7)),
-            'Workout_Days': get_valid_input("Desired Workout Days: ", int, valid_range=(1, 7)),
-            'Exercises_Per_Day': get_valid_input("Exercises Per Day: ", int, valid_range=(1, 10))
+                                                             valid_range=PROFILE_RANGES['Workout_Frequency (days/week)']),
+            'Workout_Days': get_valid_input("Desired Workout Days: ", int, valid_range=PROFILE_RANGES['Workout_Days']),
+            'Exercises_Per_Day': get_valid_input("Exercises Per Day: ", int,
+                                                 valid_range=PROFILE_RANGES['Exercises_Per_Day'])
         }
         preferred_workout = get_valid_option("Preferred workout type? Choose one",
                                              ["Mixed", "Cardio", "HIIT", "Strength", "Plyometrics", "Stretching",
                                               "Powerlifting", "Olympic Weightlifting", "Strongman"])
-        allowed_body_parts = [
-            "Abdominals", "Adductors", "Abductors", "Biceps", "Calves", "Chest",
-            "Forearms", "Glutes", "Hamstrings", "Lats", "Lower Back", "Middle Back",
-            "Traps", "Neck", "Quadriceps", "Shoulders", "Triceps", "Full Body"
-        ]
-        focused_body_parts = get_valid_options("Which body parts would you like to emphasize?", allowed_body_parts)
-        if "Full Body" in [bp.capitalize() for bp in focused_body_parts]:
-            focused_body_parts = [bp for bp in allowed_body_parts if bp.lower() != "full body"]
+        focused_body_parts = get_valid_options("Which body parts would you like to emphasize?", ALLOWED_BODY_PARTS)
+        focused_body_parts = expand_focused_body_parts(focused_body_parts)
     except Exception as e:
         logging.error(f"Error reading input: {e}")
         sys.exit(1)
@@ -543,9 +980,9 @@ def main():
         logging.error(f"Prediction Error: {e}")
         sys.exit(1)
 
-    workout_plan = generate_ml_workout_plan(user_data, merged_df, prediction,
+    workout_plan = generate_ml_workout_plan(user_data, catalog, prediction,
                                             preferred_workout if preferred_workout != "Mixed" else None,
-                                            focused_body_parts)
+                                            focused_body_parts, rng=np.random.default_rng(RANDOM_SEED))
     print("\nAI-Generated Workout Plan:")
     for day, exercises in workout_plan.items():
         print(f"\n{day}:")
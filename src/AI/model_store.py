@@ -0,0 +1,167 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import joblib
+import numpy as np
+import sklearn
+
+# Bump when the artifact layout or the pipeline's input contract changes.
+ARTIFACT_FORMAT_VERSION = 1
+MODEL_FILENAME = "model.joblib"
+METADATA_FILENAME = "metadata.json"
+PINNED_FILENAME = "PINNED"
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+
+
+# ------------------------------
+# Helper Functions
+# ------------------------------
+def file_sha256(path):
+    """Returns the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def json_default(value):
+    """JSON fallback for the NumPy scalars found in search results."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def publish_directory(tmp_dir, path):
+    """
+    Publishes the fully written tmp_dir at path. path is a symlink to a sibling directory
+    and is replaced with os.replace, which is atomic, so a reader that resolves path once
+    sees either the previous directory or the new one in full. The previous directory is
+    removed afterwards; arrays already memory-mapped from it stay valid.
+    """
+    path = os.path.abspath(path)
+    parent = os.path.realpath(os.path.dirname(path))
+    old_target = os.path.realpath(path) if os.path.islink(path) else None
+    if old_target is None and os.path.isdir(path):
+        # A plain directory from before this layout: move it aside once, non-atomically
+        old_target = tempfile.mkdtemp(prefix=f".{os.path.basename(path)}-old-", dir=parent)
+        os.rename(path, os.path.join(old_target, "previous"))
+    link_path = f"{tmp_dir}.link"
+    # A relative link keeps working when the parent directory is itself renamed into place
+    os.symlink(os.path.basename(tmp_dir), link_path)
+    os.replace(link_path, path)
+    if old_target is not None and os.path.dirname(old_target) == parent:
+        shutil.rmtree(old_target, ignore_errors=True)
+
+
+def _version_name(number):
+    return f"v{number:04d}"
+
+
+def _version_number(name):
+    try:
+        return int(name[1:]) if name.startswith('v') else None
+    except ValueError:
+        return None
+
+
+# ------------------------------
+# Versioned Model Artifacts
+# ------------------------------
+def list_model_versions(model_dir=DEFAULT_MODEL_DIR):
+    """Returns [(version, metadata), ...] for every artifact in model_dir, oldest first."""
+    if not os.path.isdir(model_dir):
+        return []
+    versions = []
+    for name in os.listdir(model_dir):
+        metadata_path = os.path.join(model_dir, name, METADATA_FILENAME)
+        if _version_number(name) is None or not os.path.exists(metadata_path):
+            continue
+        with open(metadata_path) as f:
+            versions.append((name, json.load(f)))
+    return sorted(versions, key=lambda item: _version_number(item[0]))
+
+
+def is_compatible(metadata):
+    """An artifact is only loadable by the same artifact format and scikit-learn release that wrote it."""
+    return (metadata.get('format_version') == ARTIFACT_FORMAT_VERSION
+            and metadata.get('sklearn_version') == sklearn.__version__)
+
+
+def save_model_artifact(model, metadata, model_dir=DEFAULT_MODEL_DIR, add_files=None):
+    """
+    Writes the fitted pipeline and its metadata as the next version in model_dir.
+    The version directory is assembled under a temporary name and renamed into place,
+    so readers never observe a half-written artifact. add_files(tmp_dir, version), if
+    given, writes further files (e.g. the compiled model) before the version is published.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    existing = [_version_number(v) for v, _ in list_model_versions(model_dir)]
+    version = _version_name(max(existing, default=0) + 1)
+    metadata = dict(metadata,
+                    version=version,
+                    format_version=ARTIFACT_FORMAT_VERSION,
+                    sklearn_version=sklearn.__version__,
+                    created_at=datetime.datetime.now(datetime.timezone.utc).isoformat())
+    tmp_dir = tempfile.mkdtemp(prefix=f".{version}-", dir=model_dir)
+    os.chmod(tmp_dir, 0o755)  # mkdtemp creates it private; serving workers may run as another user
+    try:
+        joblib.dump(model, os.path.join(tmp_dir, MODEL_FILENAME))
+        with open(os.path.join(tmp_dir, METADATA_FILENAME), 'w') as f:
+            json.dump(metadata, f, indent=2, default=json_default)
+        if add_files is not None:
+            add_files(tmp_dir, version)
+        os.rename(tmp_dir, os.path.join(model_dir, version))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    logging.info(f"Saved model artifact {version} to {model_dir}")
+    return version
+
+
+def pin_model_version(version, model_dir=DEFAULT_MODEL_DIR):
+    """Pins serving to a specific version, e.g. to roll back to a previous model."""
+    if not os.path.exists(os.path.join(model_dir, version, METADATA_FILENAME)):
+        raise FileNotFoundError(f"Model version {version} not found in {model_dir}")
+    with open(os.path.join(model_dir, PINNED_FILENAME), 'w') as f:
+        f.write(version)
+
+
+def unpin_model_version(model_dir=DEFAULT_MODEL_DIR):
+    """Removes the pin so serving follows the newest compatible version again."""
+    pinned_path = os.path.join(model_dir, PINNED_FILENAME)
+    if os.path.exists(pinned_path):
+        os.remove(pinned_path)
+
+
+def resolve_model_version(model_dir=DEFAULT_MODEL_DIR):
+    """Returns the pinned version if there is one, otherwise the newest compatible version."""
+    pinned_path = os.path.join(model_dir, PINNED_FILENAME)
+    if os.path.exists(pinned_path):
+        with open(pinned_path) as f:
+            return f.read().strip()
+    compatible = [v for v, metadata in list_model_versions(model_dir) if is_compatible(metadata)]
+    if not compatible:
+        raise FileNotFoundError(f"No compatible model artifact in {model_dir}. Run train.py first.")
+    return compatible[-1]
+
+
+def load_model_artifact(model_dir=DEFAULT_MODEL_DIR, version=None):
+    """Loads (model, metadata) for version, or for the version resolve_model_version picks."""
+    version = version or resolve_model_version(model_dir)
+    with open(os.path.join(model_dir, version, METADATA_FILENAME)) as f:
+        metadata = json.load(f)
+    if not is_compatible(metadata):
+        raise ValueError(f"Model version {version} was written by scikit-learn "
+                         f"{metadata.get('sklearn_version')} (format {metadata.get('format_version')}) "
+                         f"and cannot be served by scikit-learn {sklearn.__version__}.")
+    model = joblib.load(os.path.join(model_dir, version, MODEL_FILENAME))
+    logging.info(f"Loaded model artifact {version} from {model_dir}")
+    return model, metadata
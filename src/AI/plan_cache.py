@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+
+from main import rule_fitness_goal
+
+# Bucket widths for the continuous profile fields. Profiles that fall into the same
+# buckets (and agree on every categorical field and on the threshold flags below) share a cached plan.
+PROFILE_BUCKETS = {
+    'Age': 5,
+    'Weight (kg)': 2.5,
+    'Height_m': 0.02,
+    'Fat_Percentage': 2.0,
+    'Resting_BPM': 5,
+    'Water_Intake (liters)': 0.5,
+}
+
+
+# ------------------------------
+# Helper Functions
+# ------------------------------
+def _bucket(value, step):
+    return round(round(float(value) / step) * step, 6)
+
+
+def plan_cache_key(user_data, preferred_workout=None, focused_body_parts=None, seed=None):
+    """
+    Builds the cache key for a plan request: the categorical fields normalized, the
+    continuous fields bucketed (see PROFILE_BUCKETS), and the seed the plan is drawn with.
+    Buckets can straddle the BMI and body-fat thresholds, so the key also carries the
+    rule-based fitness goal and the BMI >= 25 flag the plan's HIIT top-up depends on.
+    """
+    preferred_workout = (preferred_workout or "Mixed").strip().lower()
+    bmi = float(user_data['Weight (kg)']) / float(user_data['Height_m']) ** 2
+    return (
+        tuple(_bucket(user_data[field], step) for field, step in PROFILE_BUCKETS.items()),
+        rule_fitness_goal(user_data),
+        bmi >= 25,
+        str(user_data['Gender']).strip().lower(),
+        str(user_data['Level']).strip().lower(),
+        int(user_data['Workout_Frequency (days/week)']),
+        int(user_data['Workout_Days']),
+        int(user_data['Exercises_Per_Day']),
+        None if preferred_workout == "mixed" else preferred_workout,
+        tuple(sorted({bp.strip().lower() for bp in focused_body_parts or []})),
+        seed,
+    )
+
+
+# ------------------------------
+# LRU + TTL Plan Cache
+# ------------------------------
+class PlanCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL for generated workout plans.
+
+    Every entry is tagged with the generation it was built for (e.g. catalog version,
+    model version, plan version), and get() only returns entries of the caller's
+    generation. Engines for an old and a new model can share the cache during a swap:
+    neither sees the other's plans, and entries of a retired generation age out through
+    the LRU and TTL. Cached plans are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, generation=None):
+        """Returns the cached plan for key, or None on a miss, an expired entry or one from another generation."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation:
+                self.misses += 1
+                return None
+            _, expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation=None):
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None and previous[0] != generation:
+                self.invalidations += 1  # replaces a plan built for another generation
+            self._entries[key] = (generation, time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
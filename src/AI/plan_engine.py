@@ -0,0 +1,160 @@
+import copy
+import itertools
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from main import (
+    load_datasets,
+    generate_ml_workout_plan,
+    expand_focused_body_parts,
+    ExerciseIndex,
+    plan_rng,
+    rule_fitness_goal,
+    PLAN_VERSION,
+)
+from model_store import DEFAULT_MODEL_DIR, load_model_artifact
+from plan_cache import plan_cache_key
+from fast_inference import RowPredictor
+
+BATCH_CHUNK_SIZE = 1000
+
+
+def build_row_predictor(model):
+    """Returns a RowPredictor for model, or None if its pipeline layout is not supported."""
+    try:
+        return RowPredictor(model)
+    except (ValueError, KeyError, AttributeError) as e:
+        logging.warning(f"Single-row fast path disabled: {e}")
+        return None
+
+
+# ------------------------------
+# Long-lived Plan Engine
+# ------------------------------
+class PlanEngine:
+    """
+    Holds the exercise data and a trained fitness-goal model in memory so that
+    plans can be generated in-process, without re-reading the datasets or
+    retraining the model for every request.
+
+    The fitness-goal label is the deterministic BMI/Fat_Percentage rule the model was
+    trained on, so with rule_fast_path plans take the label from rule_fitness_goal and
+    only fall back to the model when the rule's inputs are missing. predict() still
+    runs the model, since callers use it for the class probabilities.
+    """
+
+    def __init__(self, catalog, model, model_version=None, cache=None, rule_fast_path=True):
+        self.catalog = catalog
+        self.catalog_version = format(int(pd.util.hash_pandas_object(catalog, index=False).sum()), 'x')
+        self.index = ExerciseIndex(catalog)
+        self.model = model
+        self.model_version = model_version
+        self.row_predictor = build_row_predictor(model)
+        self.cache = cache
+        self.rule_fast_path = rule_fast_path
+        self._stats_lock = threading.Lock()
+        self.rule_predictions = 0
+        self.model_predictions = 0
+
+    @classmethod
+    def from_files(cls, members_file, exercises_file, model_dir=DEFAULT_MODEL_DIR, model_version=None, cache=None,
+                   rule_fast_path=True):
+        """
+        Loads the datasets once and the newest compatible model artifact (or model_version).
+        The model is never trained here; run train.py to publish a new version.
+        """
+        logging.info("Loading exercise catalog...")
+        catalog, _ = load_datasets(members_file, exercises_file)
+        model, metadata = load_model_artifact(model_dir, model_version)
+        return cls(catalog, model, metadata['version'], cache, rule_fast_path)
+
+    def with_model(self, model, model_version):
+        """Returns an engine for another model version that shares this engine's catalog, index and cache."""
+        engine = copy.copy(self)
+        engine.model = model
+        engine.model_version = model_version
+        engine.row_predictor = build_row_predictor(model)
+        return engine
+
+    def predict(self, user_data):
+        """Returns the predicted fitness focus and the per-class probabilities."""
+        probabilities = self._predict_proba([user_data])[0]
+        prediction = self.model.classes_[probabilities.argmax()]
+        return prediction, {cls: float(p) for cls, p in zip(self.model.classes_, probabilities)}
+
+    def predict_labels(self, rows):
+        """Fitness focus for each profile: the rule where it applies, one model pass for the rest."""
+        labels = [rule_fitness_goal(row) if self.rule_fast_path else None for row in rows]
+        fallback = [i for i, label in enumerate(labels) if label is None]
+        if fallback:
+            probabilities = self._predict_proba([rows[i] for i in fallback])
+            for i, label in zip(fallback, self.model.classes_[probabilities.argmax(axis=1)]):
+                labels[i] = label
+        with self._stats_lock:
+            self.rule_predictions += len(rows) - len(fallback)
+        return np.array(labels, dtype=object)
+
+    def predictor_stats(self):
+        with self._stats_lock:
+            total = self.rule_predictions + self.model_predictions
+            return {
+                'rule_fast_path': self.rule_fast_path,
+                'rule_predictions': self.rule_predictions,
+                'model_predictions': self.model_predictions,
+                'fast_path_rate': self.rule_predictions / total if total else 0.0,
+            }
+
+    def _predict_proba(self, rows):
+        """Scores a single profile on the array fast path and several in one DataFrame pass."""
+        with self._stats_lock:
+            self.model_predictions += len(rows)
+        if len(rows) == 1 and self.row_predictor is not None:
+            return self.row_predictor.predict_proba(rows[0]).reshape(1, -1)
+        return self.model.predict_proba(pd.DataFrame(rows))
+
+    def generate(self, user_data, preferred_workout=None, focused_body_parts=None, user_id=None):
+        """
+        Predicts the fitness focus for user_data and builds a workout plan for it.
+        With a user_id the plan is reproducible for that user (see plan_rng).
+        If the engine has a PlanCache, similar profiles are served from it without
+        running prediction or sampling.
+        """
+        _, workout_plan = next(self.generate_many([(user_data, preferred_workout, focused_body_parts, user_id)]))
+        return workout_plan
+
+    def generate_many(self, requests, chunk_size=BATCH_CHUNK_SIZE):
+        """
+        Yields (prediction, workout_plan) for each (user_data, preferred_workout,
+        focused_body_parts, user_id) request, in input order. Requests are consumed in
+        chunks; the cache misses of a chunk are labelled with predict_labels.
+        """
+        generation = (self.catalog_version, self.model_version, PLAN_VERSION)
+        requests = iter(requests)
+        while True:
+            chunk = [(user_data, preferred_workout, expand_focused_body_parts(focused_body_parts or []), user_id)
+                     for user_data, preferred_workout, focused_body_parts, user_id
+                     in itertools.islice(requests, chunk_size)]
+            if not chunk:
+                return
+            cache_keys = [None] * len(chunk)
+            results = [None] * len(chunk)
+            if self.cache is not None:
+                for i, (user_data, preferred_workout, focused_body_parts, user_id) in enumerate(chunk):
+                    cache_keys[i] = plan_cache_key(user_data, preferred_workout, focused_body_parts, user_id)
+                    results[i] = self.cache.get(cache_keys[i], generation)
+            misses = [i for i, result in enumerate(results) if result is None]
+            if misses:
+                predictions = self.predict_labels([chunk[i][0] for i in misses])
+                for i, prediction in zip(misses, predictions):
+                    user_data, preferred_workout, focused_body_parts, user_id = chunk[i]
+                    workout_plan = generate_ml_workout_plan(
+                        user_data, self.catalog, prediction,
+                        preferred_workout if preferred_workout != "Mixed" else None,
+                        focused_body_parts, index=self.index, rng=plan_rng(user_id))
+                    results[i] = (prediction, workout_plan)
+                    if cache_keys[i] is not None:
+                        self.cache.put(cache_keys[i], results[i], generation)
+            yield from results
@@ -0,0 +1,184 @@
+import argparse
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from tfidf_store import load_tfidf, tfidf_fingerprint
+
+TABLE_FORMAT_VERSION = 1
+DEFAULT_TOP_K = 50
+DATABASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "database")
+DEFAULT_EXERCISES_FILE = os.path.join(DATABASE_DIR, "megaGymDataset.csv")
+
+
+# ------------------------------
+# Helper Functions
+# ------------------------------
+def query_text(body_part, level):
+    """The text /api/recommendations scores for a body part and level."""
+    return f"{body_part} {level}"
+
+
+def top_k_indices(similarities, k):
+    """Indices of the k highest similarities, best first; ties keep the lower index first like np.argmax."""
+    k = min(k, len(similarities))
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+    # O(n) selection: everything above the k-th largest score, then the lowest-index ties at it
+    kth = np.partition(similarities, len(similarities) - k)[len(similarities) - k]
+    above = np.flatnonzero(similarities > kth)
+    ties = np.flatnonzero(similarities == kth)[:k - len(above)]
+    candidates = np.concatenate([above, ties])
+    return candidates[np.lexsort((candidates, -similarities[candidates]))]
+
+
+# ------------------------------
+# Live Scoring
+# ------------------------------
+class LiveScorer:
+    """
+    Cosine similarity of a query against every TF-IDF row as one sparse matrix-vector
+    product. The row norms are computed once per artifact, so no request copies or
+    normalizes the (possibly memory-mapped) matrix, and the cost is linear in its size.
+    """
+
+    def __init__(self, tfidf_matrix, tfidf_vectorizer):
+        self.matrix = sp.csr_matrix(tfidf_matrix)
+        self.vectorizer = tfidf_vectorizer
+        self.row_norms = np.sqrt(np.asarray(self.matrix.multiply(self.matrix).sum(axis=1)).ravel())
+
+    def similarities(self, body_part, level):
+        query = self.vectorizer.transform([query_text(body_part, level)])
+        dots = (self.matrix @ query.T).toarray().ravel()
+        norms = self.row_norms * np.sqrt(query.multiply(query).sum())
+        return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+    def top_k(self, body_part, level, k):
+        return top_k_indices(self.similarities(body_part, level), k)
+
+
+# ------------------------------
+# Precomputed Recommendation Table
+# ------------------------------
+class RecommendationTable:
+    """
+    Top-k exercise rows per body part/level query, precomputed for one TF-IDF artifact.
+    Entries are keyed by the vectorizer's analyzed tokens, so any spelling of a query
+    that the vectorizer turns into the same vector (case, spacing) hits the same entry.
+    """
+
+    def __init__(self, entries, k, fingerprint):
+        self.entries = entries
+        self.k = k
+        self.fingerprint = fingerprint
+        self.analyzer = None
+
+    def bind(self, tfidf_vectorizer):
+        self.analyzer = tfidf_vectorizer.build_analyzer()
+        return self
+
+    def lookup(self, body_part, level):
+        """Top-k row indices for the query, or None if it was not precomputed."""
+        return self.entries.get(tuple(self.analyzer(query_text(body_part, level))))
+
+
+def build_recommendation_table(tfidf_matrix, tfidf_vectorizer, body_parts, levels, k=DEFAULT_TOP_K):
+    """
+    Scores every body part/level pair once against the whole matrix and keeps the top-k rows.
+    The scores come from the LiveScorer the service uses past the table, so both rank
+    (and break ties) identically and pages across the table boundary line up.
+    """
+    scorer = LiveScorer(tfidf_matrix, tfidf_vectorizer)
+    analyzer = tfidf_vectorizer.build_analyzer()
+    entries = {}
+    for body_part in body_parts:
+        for level in levels:
+            entries[tuple(analyzer(query_text(body_part, level)))] = scorer.top_k(body_part, level, k).tolist()
+    logging.info(f"Precomputed {len(entries)} body part/level queries (top {k})")
+    return RecommendationTable(entries, k, tfidf_fingerprint(tfidf_matrix, tfidf_vectorizer)).bind(tfidf_vectorizer)
+
+
+def recommendation_page(scorer, table, body_part, level, k, offset=0):
+    """
+    Row indices ranked offset + 1 to offset + k for the query. Pages within the table are a
+    lookup; a page reaching past it (or a query that was not precomputed) is scored live.
+    """
+    top_indices = table.lookup(body_part, level) if table is not None else None
+    if top_indices is None or offset + k > table.k:
+        top_indices = scorer.top_k(body_part, level, offset + k)
+    return [int(index) for index in top_indices[offset:offset + k]]
+
+
+def save_recommendation_table(table, path):
+    payload = {
+        'format_version': TABLE_FORMAT_VERSION,
+        'k': table.k,
+        'tfidf_fingerprint': table.fingerprint,
+        'entries': [{'tokens': list(tokens), 'indices': indices} for tokens, indices in table.entries.items()],
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+    logging.info(f"Saved recommendation table to {path}")
+
+
+def load_recommendation_table(path, tfidf_matrix, tfidf_vectorizer):
+    """
+    Loads the table for the given TF-IDF artifact. Returns None (live scoring only) when
+    there is no table or it was built from a different artifact.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        payload = json.load(f)
+    if payload.get('format_version') != TABLE_FORMAT_VERSION:
+        logging.warning(f"Ignoring {path}: unsupported format {payload.get('format_version')}")
+        return None
+    if payload['tfidf_fingerprint'] != tfidf_fingerprint(tfidf_matrix, tfidf_vectorizer):
+        logging.warning(f"Ignoring {path}: it was built from a different TF-IDF artifact")
+        return None
+    entries = {tuple(entry['tokens']): entry['indices'] for entry in payload['entries']}
+    return RecommendationTable(entries, payload['k'], payload['tfidf_fingerprint']).bind(tfidf_vectorizer)
+
+
+def valid_body_parts_and_levels(exercises_file):
+    """Every body part and level in the exercises dataset, plus the body parts the app offers."""
+    from main import ALLOWED_BODY_PARTS
+    df = pd.read_csv(exercises_file, usecols=['BodyPart', 'Level'])
+    body_parts = sorted(set(df['BodyPart'].dropna().astype(str)) | set(ALLOWED_BODY_PARTS))
+    levels = sorted(set(df['Level'].dropna().astype(str)))
+    return body_parts, levels
+
+
+# ------------------------------
+# Main Function with CLI via argparse
+# ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Precompute /api/recommendations results for every body part/level")
+    parser.add_argument('--tfidf', type=str, default="tfidf_index" if os.path.isdir("tfidf_index") else "main.pkl",
+                        help="TF-IDF index directory or pickled (tfidf_matrix, tfidf_vectorizer)")
+    parser.add_argument('--exercises_file', type=str, default=DEFAULT_EXERCISES_FILE,
+                        help="Exercises dataset CSV listing the valid body parts and levels")
+    parser.add_argument('--k', type=int, default=DEFAULT_TOP_K, help="Exercises kept per query")
+    parser.add_argument('--output', type=str, default="recommendation_table.json", help="Output JSON file")
+    args = parser.parse_args()
+
+    try:
+        tfidf_matrix, tfidf_vectorizer = load_tfidf(args.tfidf)
+        body_parts, levels = valid_body_parts_and_levels(args.exercises_file)
+        table = build_recommendation_table(tfidf_matrix, tfidf_vectorizer, body_parts, levels, args.k)
+        save_recommendation_table(table, args.output)
+    except Exception as e:
+        logging.error(f"Build Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
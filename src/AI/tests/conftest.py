@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The AI modules import each other as top-level modules (see src/API for the same setup)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compiled_forest import CompiledModel, load_compiled_model, save_compiled_model
+from fast_inference import RowPredictor, model_profile
+from main import build_fitness_goal_pipeline, fitness_goal_split, load_members_dataset
+
+MEMBERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "database",
+                            "gym_members_exercise_tracking.csv")
+
+
+@pytest.fixture(scope="module")
+def members():
+    return load_members_dataset(MEMBERS_FILE)
+
+
+@pytest.fixture(scope="module")
+def pipeline(members):
+    """A small forest fitted like train_fitness_goal_model's candidates, without the search."""
+    pipeline, _ = build_fitness_goal_pipeline(members)
+    pipeline.set_params(classifier__n_estimators=25)
+    X_train, _, y_train, _ = fitness_goal_split(members)
+    return pipeline.fit(X_train, y_train)
+
+
+def edge_case_profiles(members):
+    """Member rows with missing numeric fields, missing categories and categories never seen in training."""
+    base = members.iloc[:12].to_dict('records')
+    edits = [
+        {'Fat_Percentage': np.nan},
+        {'Weight (kg)': np.nan},
+        {'Resting_BPM': np.nan},
+        {'Water_Intake (liters)': np.nan, 'Age': np.nan},
+        {'Gender': np.nan},
+        {'Level': None},
+        {'Gender': 'Other'},
+        {'Level': 'Expert'},
+        {'Gender': 'Other', 'Level': 'Expert', 'Fat_Percentage': np.nan},
+        {'Calories_Burned': np.nan, 'Session_Duration (hours)': np.nan},
+        {'Max_BPM': np.nan},
+        {'Workout_Frequency (days/week)': np.nan},
+    ]
+    return [dict(row, **edit) for row, edit in zip(base, edits)]
+
+
+def assert_same_probabilities(pipeline, profiles, tmp_path):
+    profiles = [model_profile(profile) for profile in profiles]
+    expected = pipeline.predict_proba(pd.DataFrame(profiles))
+    compiled = CompiledModel.from_pipeline(pipeline)
+    save_compiled_model(compiled, str(tmp_path / "compiled"))
+    for model in [compiled, load_compiled_model(str(tmp_path / "compiled"))]:
+        assert list(model.classes_) == list(pipeline.classes_)
+        np.testing.assert_allclose(model.predict_proba(profiles), expected, rtol=0, atol=1e-12)
+    row_predictor = RowPredictor(pipeline)
+    np.testing.assert_allclose(np.vstack([row_predictor.predict_proba(profile) for profile in profiles]),
+                               expected, rtol=0, atol=1e-12)
+
+
+def test_compiled_model_matches_pipeline_on_member_rows(members, pipeline, tmp_path):
+    assert_same_probabilities(pipeline, members.to_dict('records'), tmp_path)
+
+
+def test_compiled_model_matches_pipeline_on_missing_and_unknown_values(members, pipeline, tmp_path):
+    assert_same_probabilities(pipeline, edge_case_profiles(members), tmp_path)
@@ -0,0 +1,37 @@
+import pickle
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from tfidf_store import load_tfidf, save_tfidf_index, tfidf_fingerprint
+
+
+def unsorted_tfidf():
+    """A fitted TF-IDF whose CSR matrix stores each row's column indices in reverse order, like main.pkl."""
+    docs = ["push-up Chest Beginner", "barbell squat Quadriceps Intermediate", "plank Abdominals Beginner",
+            "cable fly Chest Expert", "deadlift Lower Back Intermediate"]
+    vectorizer = TfidfVectorizer()
+    matrix = vectorizer.fit_transform(docs).tocsr()
+    matrix.sort_indices()
+    indices, data = matrix.indices.copy(), matrix.data.copy()
+    for start, end in zip(matrix.indptr[:-1], matrix.indptr[1:]):
+        indices[start:end] = indices[start:end][::-1]
+        data[start:end] = data[start:end][::-1]
+    unsorted = sp.csr_matrix((data, indices, matrix.indptr.copy()), shape=matrix.shape)
+    unsorted.has_sorted_indices = False
+    return unsorted, vectorizer
+
+
+def test_pickle_and_exported_index_have_the_same_fingerprint(tmp_path):
+    tfidf_matrix, tfidf_vectorizer = unsorted_tfidf()
+    assert not np.array_equal(tfidf_matrix.indices, tfidf_matrix.sorted_indices().indices)
+    pickle_path = tmp_path / "main.pkl"
+    with open(pickle_path, 'wb') as f:
+        pickle.dump((tfidf_matrix, tfidf_vectorizer), f)
+    save_tfidf_index(tfidf_matrix, tfidf_vectorizer, str(tmp_path / "tfidf_index"))
+
+    pickled = load_tfidf(str(pickle_path))
+    exported = load_tfidf(str(tmp_path / "tfidf_index"))
+    assert tfidf_fingerprint(*pickled) == tfidf_fingerprint(*exported)
+    assert (pickled[0] != exported[0]).nnz == 0
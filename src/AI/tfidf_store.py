@@ -0,0 +1,157 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from model_store import publish_directory
+
+TFIDF_FORMAT_VERSION = 1
+META_FILENAME = "meta.json"
+VOCABULARY_FILENAME = "vocabulary.json"
+MATRIX_ARRAYS = ['data', 'indices', 'indptr']
+
+
+# ------------------------------
+# Helper Functions
+# ------------------------------
+def _vectorizer_params(vectorizer):
+    """The vectorizer's constructor parameters as JSON values; custom callables cannot be exported."""
+    params = {}
+    for key, value in vectorizer.get_params().items():
+        if key == 'vocabulary':
+            continue  # restored from vocabulary_ instead
+        if key == 'dtype':
+            value = np.dtype(value).name
+        elif callable(value):
+            raise ValueError(f"TfidfVectorizer parameter {key} is a custom callable and cannot be exported")
+        elif isinstance(value, (set, frozenset, tuple)):
+            value = sorted(value) if key == 'stop_words' else list(value)
+        params[key] = value
+    return params
+
+
+def _build_vectorizer(params, vocabulary, idf):
+    params = dict(params, dtype=np.dtype(params['dtype']).type)
+    if isinstance(params.get('ngram_range'), list):
+        params['ngram_range'] = tuple(params['ngram_range'])
+    vectorizer = TfidfVectorizer(**params)
+    vectorizer.vocabulary_ = vocabulary
+    vectorizer.fixed_vocabulary_ = False
+    if idf is not None:
+        vectorizer.idf_ = idf
+    return vectorizer
+
+
+def tfidf_fingerprint(tfidf_matrix, tfidf_vectorizer):
+    """
+    Content hash of a TF-IDF artifact, so derived tables can tell which artifact they belong to.
+    The matrix is hashed in canonical CSR form, so a pickle and its exported index (whose
+    indices save_tfidf_index sorts) have the same fingerprint.
+    """
+    matrix = sp.csr_matrix(tfidf_matrix, copy=True)
+    matrix.sum_duplicates()
+    matrix.sort_indices()
+    digest = hashlib.sha256(json.dumps(list(matrix.shape)).encode())
+    for array in (matrix.data, matrix.indices, matrix.indptr):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(json.dumps(sorted(tfidf_vectorizer.vocabulary_.items(), key=lambda item: item[1]),
+                             default=int).encode())
+    return digest.hexdigest()
+
+
+# ------------------------------
+# Export and Load
+# ------------------------------
+def save_tfidf_index(tfidf_matrix, tfidf_vectorizer, path):
+    """
+    Writes the TF-IDF matrix as its CSR components (.npy) and the vectorizer as its
+    parameters, vocabulary and idf weights, so the matrix can be memory-mapped instead
+    of unpickled. The directory is assembled under a temporary name and published with
+    publish_directory.
+    """
+    matrix = sp.csr_matrix(tfidf_matrix)
+    matrix.sort_indices()
+    meta = {
+        'format_version': TFIDF_FORMAT_VERSION,
+        'shape': list(matrix.shape),
+        'vectorizer': _vectorizer_params(tfidf_vectorizer),
+        'use_idf': bool(tfidf_vectorizer.use_idf),
+    }
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp_dir = tempfile.mkdtemp(prefix=".tfidf-", dir=parent)
+    os.chmod(tmp_dir, 0o755)  # mkdtemp creates it private; serving workers may run as another user
+    try:
+        for name in MATRIX_ARRAYS:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), getattr(matrix, name))
+        if tfidf_vectorizer.use_idf:
+            np.save(os.path.join(tmp_dir, "idf.npy"), tfidf_vectorizer.idf_)
+        with open(os.path.join(tmp_dir, VOCABULARY_FILENAME), 'w') as f:
+            json.dump({term: int(i) for term, i in tfidf_vectorizer.vocabulary_.items()}, f)
+        with open(os.path.join(tmp_dir, META_FILENAME), 'w') as f:
+            json.dump(meta, f, indent=2)
+        publish_directory(tmp_dir, path)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    logging.info(f"Saved TF-IDF index ({matrix.shape[0]} documents, {matrix.nnz} non-zeros) to {path}")
+
+
+def load_tfidf_index(path, mmap=True):
+    """
+    Returns (tfidf_matrix, tfidf_vectorizer). With mmap the CSR arrays are memory-mapped
+    read-only, so every worker process shares one copy in the page cache.
+    """
+    path = os.path.realpath(path)  # read one published directory even if it is swapped meanwhile
+    with open(os.path.join(path, META_FILENAME)) as f:
+        meta = json.load(f)
+    if meta.get('format_version') != TFIDF_FORMAT_VERSION:
+        raise ValueError(f"Unsupported TF-IDF index format {meta.get('format_version')} in {path}")
+    data, indices, indptr = (np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None)
+                             for name in MATRIX_ARRAYS)
+    tfidf_matrix = sp.csr_matrix((data, indices, indptr), shape=tuple(meta['shape']), copy=False)
+    with open(os.path.join(path, VOCABULARY_FILENAME)) as f:
+        vocabulary = json.load(f)
+    idf = np.load(os.path.join(path, "idf.npy")) if meta['use_idf'] else None
+    return tfidf_matrix, _build_vectorizer(meta['vectorizer'], vocabulary, idf)
+
+
+def load_tfidf(path, mmap=True):
+    """Loads an exported TF-IDF index directory, or a pickled (tfidf_matrix, tfidf_vectorizer) file."""
+    if os.path.isdir(path):
+        return load_tfidf_index(path, mmap)
+    with open(path, 'rb') as f:
+        tfidf_matrix, tfidf_vectorizer = pickle.load(f)
+    return tfidf_matrix, tfidf_vectorizer
+
+
+# ------------------------------
+# Main Function with CLI via argparse
+# ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Export a pickled TF-IDF matrix and vectorizer for memory-mapping")
+    parser.add_argument('--pickle', type=str, default="main.pkl",
+                        help="Pickled (tfidf_matrix, tfidf_vectorizer) tuple")
+    parser.add_argument('--output', type=str, default="tfidf_index", help="Output directory")
+    args = parser.parse_args()
+
+    try:
+        with open(args.pickle, 'rb') as f:
+            tfidf_matrix, tfidf_vectorizer = pickle.load(f)
+        save_tfidf_index(tfidf_matrix, tfidf_vectorizer, args.output)
+    except Exception as e:
+        logging.error(f"Export Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,178 @@
+import argparse
+import hashlib
+import json
+import logging
+import sys
+import time
+from functools import partial
+
+from compiled_forest import add_compiled_model
+from sklearn.metrics import balanced_accuracy_score
+
+from main import (
+    TRAINING_BACKENDS,
+    fitness_goal_split,
+    load_members_dataset,
+    train_fitness_goal_model,
+    update_fitness_goal_model,
+)
+from training_report import write_training_report
+from model_store import (
+    DEFAULT_MODEL_DIR,
+    file_sha256,
+    json_default,
+    list_model_versions,
+    is_compatible,
+    save_model_artifact,
+    pin_model_version,
+    unpin_model_version,
+    resolve_model_version,
+    load_model_artifact,
+)
+
+
+# ------------------------------
+# Search Strategy Comparison
+# ------------------------------
+def compare_search_strategies(df_members, report_path, strategies=('random', 'halving'), **parallelism):
+    """Trains with each search strategy and writes wall-clock time and accuracy side by side."""
+    results = []
+    for strategy in strategies:
+        _, report = train_fitness_goal_model(df_members, return_report=True, search_strategy=strategy,
+                                             **parallelism)
+        results.append({key: report[key] for key in ['search_strategy', 'search_seconds', 'cv_balanced_accuracy',
+                                                     'test_balanced_accuracy', 'best_params']})
+        logging.info(f"{strategy}: {report['search_seconds']:.1f}s, "
+                     f"test balanced accuracy {report['test_balanced_accuracy']:.3f}")
+    with open(report_path, 'w') as f:
+        json.dump(results, f, indent=2, default=json_default)
+    return results
+
+
+# ------------------------------
+# Incremental Update
+# ------------------------------
+def publish_incremental_update(new_rows_file, model_dir=DEFAULT_MODEL_DIR, base_version=None,
+                               n_new_trees=50, max_estimators=None):
+    """
+    Adds trees trained on the rows in new_rows_file to a stored model and saves the
+    result as a new version. Hyperparameters and preprocessing come from the base version;
+    a full retrain (plain train.py) retunes them and resets the incremental counter.
+    A stratified 20% of the new rows is held out and the updated model is scored on it;
+    no cross-validation runs, so the version records no cv_balanced_accuracy.
+    """
+    model, base = load_model_artifact(model_dir, base_version)
+    df_new = load_members_dataset(new_rows_file)
+    X_train, X_test, _, y_test = fitness_goal_split(df_new)
+    start = time.perf_counter()
+    model = update_fitness_goal_model(model, X_train, n_new_trees=n_new_trees, max_estimators=max_estimators)
+    update_seconds = time.perf_counter() - start
+    test_score = balanced_accuracy_score(y_test, model.predict(X_test))
+    logging.info(f"Updated model: test balanced accuracy {test_score:.3f} on {len(X_test)} held-out new rows")
+    delta_sha256 = file_sha256(new_rows_file)
+    metadata = {key: base[key] for key in ['best_params', 'features', 'classes'] if key in base}
+    metadata.update(
+        update_type='incremental',
+        parent_version=base['version'],
+        update_seconds=update_seconds,
+        test_balanced_accuracy=float(test_score),
+        test_rows=len(X_test),
+        parent_test_balanced_accuracy=base.get('test_balanced_accuracy'),
+        # the training data is the parent's plus the delta, so its hash chains both
+        data_sha256=hashlib.sha256(f"{base.get('data_sha256')}+{delta_sha256}".encode()).hexdigest(),
+        delta_sha256=delta_sha256,
+        delta_rows=len(X_train),
+        data_rows=base.get('data_rows', 0) + len(X_train),
+        n_estimators=len(model.named_steps['classifier'].estimators_),
+        incremental_updates_since_full=base.get('incremental_updates_since_full', 0) + 1,
+    )
+    version = save_model_artifact(model, metadata, model_dir, add_files=partial(add_compiled_model, model))
+    return version
+
+
+# ------------------------------
+# Main Function with CLI via argparse
+# ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Train the fitness-goal model and manage its versioned artifacts")
+    parser.add_argument('--members_file', type=str, help="Path to the gym members dataset CSV")
+    parser.add_argument('--model_dir', type=str, default=DEFAULT_MODEL_DIR, help="Directory holding model versions")
+    parser.add_argument('--list', action='store_true', help="List the stored model versions and exit")
+    parser.add_argument('--rollback', type=str, metavar='VERSION', help="Pin serving to a previous model version")
+    parser.add_argument('--unpin', action='store_true', help="Serve the newest compatible version again")
+    parser.add_argument('--search', type=str, choices=['random', 'halving'], default='random',
+                        help="Hyperparameter search: full randomized search or successive halving")
+    parser.add_argument('--cache_dir', type=str, default=None,
+                        help="Directory for caching fitted preprocessing stages during the search")
+    parser.add_argument('--cpu_budget', type=int, default=None,
+                        help="Cores training may use in total (default: all cores)")
+    parser.add_argument('--inner_jobs', type=int, default=1,
+                        help="Threads per candidate fit (forest and BLAS); the rest of the budget runs fits in parallel")
+    parser.add_argument('--backend', type=str, choices=TRAINING_BACKENDS, default='loky',
+                        help="joblib backend for the parallel candidate fits")
+    parser.add_argument('--compare_search', type=str, metavar='REPORT_JSON', default=None,
+                        help="Run both search strategies, write a time/accuracy comparison and exit")
+    parser.add_argument('--incremental', type=str, metavar='NEW_ROWS_CSV', default=None,
+                        help="Add trees trained on new member rows to the current model instead of a full search")
+    parser.add_argument('--base_version', type=str, default=None,
+                        help="Version to update incrementally (default: the serving version)")
+    parser.add_argument('--new_trees', type=int, default=50, help="Trees added per incremental update")
+    parser.add_argument('--max_estimators', type=int, default=None,
+                        help="Drop the oldest trees once an incremental update exceeds this forest size")
+    parser.add_argument('--report_dir', type=str, default=None,
+                        help="After a full training run, write the report and feature importances (JSON/PNG) here")
+    args = parser.parse_args()
+
+    if args.list:
+        try:
+            serving = resolve_model_version(args.model_dir)
+        except FileNotFoundError:
+            serving = None
+        for version, metadata in list_model_versions(args.model_dir):
+            marker = '*' if version == serving else ' '
+            compatible = '' if is_compatible(metadata) else ' (incompatible)'
+            update = f"  +{metadata['parent_version']}" if metadata.get('update_type') == 'incremental' else ''
+            print(f"{marker} {version}  {metadata['created_at']}  "
+                  f"test={metadata['test_balanced_accuracy']:.3f}  data={metadata['data_sha256'][:12]}"
+                  f"{update}{compatible}")
+        return
+    if args.rollback:
+        pin_model_version(args.rollback, args.model_dir)
+        logging.info(f"Serving pinned to {args.rollback}")
+        return
+    if args.unpin:
+        unpin_model_version(args.model_dir)
+        logging.info(f"Serving follows the newest compatible version ({resolve_model_version(args.model_dir)})")
+        return
+    if args.incremental:
+        try:
+            publish_incremental_update(args.incremental, args.model_dir, args.base_version,
+                                       args.new_trees, args.max_estimators)
+        except Exception as e:
+            logging.error(f"Incremental Update Error: {e}")
+            sys.exit(1)
+        return
+    if not args.members_file:
+        parser.error("--members_file is required for training")
+
+    parallelism = dict(cpu_budget=args.cpu_budget, inner_jobs=args.inner_jobs, backend=args.backend)
+    if args.compare_search:
+        compare_search_strategies(load_members_dataset(args.members_file), args.compare_search, **parallelism)
+        return
+
+    try:
+        df_members = load_members_dataset(args.members_file)
+        model, report = train_fitness_goal_model(df_members, return_report=True, search_strategy=args.search,
+                                                 cache_dir=args.cache_dir, **parallelism)
+    except Exception as e:
+        logging.error(f"Training Error: {e}")
+        sys.exit(1)
+    report.update(data_sha256=file_sha256(args.members_file), data_rows=len(df_members),
+                  update_type='full', incremental_updates_since_full=0)
+    version = save_model_artifact(model, report, args.model_dir, add_files=partial(add_compiled_model, model))
+    if args.report_dir:
+        write_training_report(model, dict(report, version=version), args.report_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import json
+import logging
+import os
+
+import pandas as pd
+
+from model_store import json_default
+
+REPORT_FILENAME = "training_report.json"
+IMPORTANCES_PLOT_FILENAME = "feature_importances.png"
+
+
+# ------------------------------
+# Feature Importances
+# ------------------------------
+def feature_importances(model):
+    """Returns the classifier's feature importances as a DataFrame, most important first."""
+    try:
+        all_feature_names = model.named_steps['preprocessor'].get_feature_names_out()
+        mask = model.named_steps['feature_selection'].get_support()
+        selected_feature_names = all_feature_names[mask]
+    except Exception as e:
+        logging.warning(f"Could not retrieve feature names properly: {e}")
+        selected_feature_names = [f"Feature_{i}" for i in
+                                  range(len(model.named_steps['classifier'].feature_importances_))]
+    importances = model.named_steps['classifier'].feature_importances_
+    return pd.DataFrame({
+        'Feature': selected_feature_names,
+        'Importance': importances
+    }).sort_values('Importance', ascending=False)
+
+
+def plot_feature_importances(importance_df, path):
+    """Saves a bar chart of the top 20 feature importances to path."""
+    # The plotting stack is only needed here, so it is not imported by training or serving
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig = plt.figure(figsize=(12, 8))
+    sns.barplot(x='Importance', y='Feature', data=importance_df.head(20))
+    plt.title('Top 20 Feature Importances')
+    plt.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+# ------------------------------
+# Training Report
+# ------------------------------
+def write_training_report(model, report, report_dir, plot=True):
+    """
+    Writes the training report and the feature importances to report_dir as JSON and,
+    with plot, the importance chart as PNG. Returns the paths written.
+    """
+    os.makedirs(report_dir, exist_ok=True)
+    importance_df = feature_importances(model)
+    report_path = os.path.join(report_dir, REPORT_FILENAME)
+    with open(report_path, 'w') as f:
+        json.dump(dict(report, feature_importances=importance_df.to_dict('records')), f, indent=2,
+                  default=json_default)
+    paths = [report_path]
+    if plot:
+        plot_path = os.path.join(report_dir, IMPORTANCES_PLOT_FILENAME)
+        plot_feature_importances(importance_df, plot_path)
+        paths.append(plot_path)
+    logging.info(f"Wrote training report to {report_dir}")
+    return paths
@@ -1,31 +1,145 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+import json
 import logging
+import os
+import sys
 import pandas as pd
 import numpy as np
-from sklearn.externals import joblib  # Ensure model is properly loaded
+import joblib
+
+from micro_batcher import MicroBatcher
+from model_registry import ModelRegistry, file_version
+
+# The pickled pipeline references main.AdvancedFeatureEngineer, so src/AI must be importable
+AI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AI")
+sys.path.insert(0, AI_DIR)
+
+from model_store import load_model_artifact, resolve_model_version
+from compiled_forest import COMPILED_DIRNAME, CompiledModel, load_compiled_model
+from fast_inference import model_profile
 
 # Initialize Flask app
-app = Flask(_name_)
+app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 
-# Load pre-trained model
-model = joblib.load("model.pkl")  # Ensure this file exists
+# Pre-trained model: the serving version of a train.py model directory, or a single pickled pipeline.
+# Either is watched and hot-swapped when a new version (or a rewritten file) appears.
+MODEL_DIR = os.environ.get("FYTAI_MODEL_DIR")
+MODEL_PATH = os.environ.get("FYTAI_MODEL_PATH", "model.pkl")
+MODEL_POLL_SECONDS = float(os.environ.get("FYTAI_MODEL_POLL_SECONDS", "30"))  # 0 disables reloading
+# Serve the compiled forest of a version when it has one: its arrays are memory-mapped read-only,
+# so all worker processes share one copy instead of unpickling their own
+USE_COMPILED_MODEL = os.environ.get("FYTAI_COMPILED_MODEL", "1") != "0"
+
+WARMUP_PROFILE = {
+    'Age': 30, 'Gender': 'Male', 'Level': 'Intermediate', 'Weight (kg)': 75.0, 'Height_m': 1.78,
+    'Resting_BPM': 65, 'Fat_Percentage': 20.0, 'Water_Intake (liters)': 2.5, 'Workout_Frequency (days/week)': 4
+}
+
+def load_model(version):
+    path = os.path.join(MODEL_DIR, version, COMPILED_DIRNAME) if MODEL_DIR else MODEL_PATH
+    if USE_COMPILED_MODEL and os.path.isdir(path):
+        return load_compiled_model(path, mmap=True)
+    if MODEL_DIR:
+        return load_model_artifact(MODEL_DIR, version)[0]
+    return joblib.load(MODEL_PATH)  # Ensure this file exists
+
+def model_input(model, profiles):
+    """Compiled models score the profile dicts directly; the sklearn pipeline needs a DataFrame."""
+    return profiles if isinstance(model, CompiledModel) else pd.DataFrame(profiles)
+
+def warm_up(model):
+    """Runs a few predictions so the first requests after a swap do not pay for lazy initialization."""
+    for size in (1, 8):
+        model.predict_proba(model_input(model, [WARMUP_PROFILE] * size))
+
+registry = ModelRegistry(
+    "predict-model",
+    version_fn=(lambda: resolve_model_version(MODEL_DIR)) if MODEL_DIR else (lambda: file_version(MODEL_PATH)),
+    load_fn=load_model, warmup_fn=warm_up, poll_seconds=MODEL_POLL_SECONDS
+).start()
+
+# Optional micro-batching of concurrent requests; a window of 0 ms (the default) scores each request directly
+MICRO_BATCH_WINDOW_MS = float(os.environ.get("FYTAI_MICRO_BATCH_WINDOW_MS", "0"))
+MICRO_BATCH_MAX_SIZE = int(os.environ.get("FYTAI_MICRO_BATCH_MAX_SIZE", "64"))
+
+def read_profiles():
+    """
+    Returns (profiles, ndjson, single) for the request body: a JSON object, a JSON list
+    of objects, or NDJSON (one object per line).
+    """
+    if request.mimetype == 'application/x-ndjson':
+        lines = request.get_data(as_text=True).splitlines()
+        return [json.loads(line) for line in lines if line.strip()], True, False
+    data = request.get_json(silent=True)
+    if data is None:
+        raise ValueError("Request body must be valid JSON")
+    if isinstance(data, list):
+        return data, False, False
+    return [data], False, True
+
+class ModelNotLoaded(Exception):
+    pass
+
+def score_profiles(profiles):
+    """
+    Runs the pipeline once over all profiles (each reduced to the model's fields, so
+    the result for one never depends on the others); the label is the most probable class.
+    The whole call uses one registry snapshot, whose version is reported with each result.
+    """
+    if not all(isinstance(profile, dict) for profile in profiles):
+        raise ValueError("Each profile must be a JSON object")
+    profiles = [model_profile(profile) for profile in profiles]
+    model_version, model = registry.current()
+    if model is None:
+        raise ModelNotLoaded("Model is not loaded")
+    probabilities = model.predict_proba(model_input(model, profiles))
+    predictions = model.classes_[np.argmax(probabilities, axis=1)]
+    return [
+        {
+            "predicted_fitness_focus": str(prediction),
+            "confidence_levels": {str(cls): f"{p:.1%}" for cls, p in zip(model.classes_, row)},
+            "model_version": model_version
+        }
+        for prediction, row in zip(predictions, probabilities)
+    ]
+
+batcher = MicroBatcher(score_profiles, MICRO_BATCH_WINDOW_MS, MICRO_BATCH_MAX_SIZE) \
+    if MICRO_BATCH_WINDOW_MS > 0 else None
 
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
-        data = request.get_json()
-        user_df = pd.DataFrame([data])
-        prediction = model.predict(user_df)[0]
-        probabilities = model.predict_proba(user_df)[0]
-        response = {
-            "predicted_fitness_focus": prediction,
-            "confidence_levels": {model.classes_[i]: f"{p:.1%}" for i, p in enumerate(probabilities)}
-        }
-        return jsonify(response)
+        profiles, ndjson, single = read_profiles()
+        if not profiles:
+            return jsonify([])
+        if batcher is not None and len(profiles) < MICRO_BATCH_MAX_SIZE:
+            results = batcher.submit(profiles)
+        else:
+            results = score_profiles(profiles)
+    except ModelNotLoaded as e:
+        return jsonify({"error": str(e)}), 503
+    except (ValueError, TypeError, KeyError) as e:
+        logging.error(f"Invalid Request: {e}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logging.error(f"Prediction Error: {e}")
         return jsonify({"error": str(e)}), 500
+    if ndjson:
+        return Response("".join(json.dumps(result) + "\n" for result in results), mimetype='application/x-ndjson')
+    return jsonify(results[0] if single else results)
+
+@app.route('/predict/model', methods=['GET'])
+def model_info():
+    """Reports the model version being served and the reload counters."""
+    return jsonify(registry.stats())
+
+@app.route('/predict/batcher_stats', methods=['GET'])
+def batcher_stats():
+    """Reports queue depth and batch sizes of the micro-batcher."""
+    if batcher is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **batcher.stats()})
 
-if _name_ == '_main_':
-    app.run(debug=True)
\ No newline at end of file
+if __name__ == '__main__':
+    app.run(debug=True)
@@ -0,0 +1,180 @@
+import argparse
+import csv
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from model_registry import file_version
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATABASE_PATH = os.path.join(API_DIR, "gym_database.db")
+DEFAULT_EXERCISES_FILE = os.path.join(API_DIR, "..", "..", "database", "megaGymDataset.csv")
+
+
+def database_version(path):
+    """Version id for an SQLite database: covers the main file and its write-ahead log."""
+    wal_path = f"{path}-wal"
+    wal_version = file_version(wal_path) if os.path.exists(wal_path) else "-"
+    return f"{file_version(path)}/{wal_version}"
+
+
+def build_exercise_database(exercises_file=DEFAULT_EXERCISES_FILE, path=DEFAULT_DATABASE_PATH):
+    """
+    Offline step: writes the Exercises table from the exercises CSV (row i becomes id i + 1,
+    matching the TF-IDF rows) into a new database in WAL mode, so the serving processes'
+    read-only connections never block a later rebuild, then moves it into place.
+    """
+    with open(exercises_file, newline='') as f:
+        rows = [(i + 1, row['Title'], row['Desc'] or None) for i, row in enumerate(csv.DictReader(f))]
+    tmp_path = f"{path}.tmp"
+    for stale in (tmp_path, f"{tmp_path}-wal", f"{tmp_path}-shm"):
+        if os.path.exists(stale):
+            os.remove(stale)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE Exercises (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT,
+                description TEXT
+            )
+        """)
+        conn.executemany("INSERT INTO Exercises (id, title, description) VALUES (?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()  # the last connection checkpoints and removes the -wal file
+    # The old file's WAL index must not be paired with the new database
+    for stale in (f"{path}-wal", f"{path}-shm"):
+        if os.path.exists(stale):
+            os.remove(stale)
+    os.replace(tmp_path, path)
+    logging.info(f"Wrote {len(rows)} exercises to {path}")
+
+
+class SQLiteConnectionPool:
+    """
+    A fixed set of persistent read-only connections shared across threads. Connections
+    are opened with mode=ro and PRAGMA query_only, so serving never writes the database
+    (WAL mode is set by build_exercise_database), and a caller holds one exclusively
+    between checkout and return. reopen() replaces the set, e.g. after the database
+    file was swapped out; connections still checked out are closed when returned.
+    """
+
+    def __init__(self, path, size=4):
+        self.path = os.path.abspath(path)
+        if not os.path.isfile(self.path):
+            raise FileNotFoundError(f"SQLite database not found: {self.path}")
+        self.size = size
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._idle = queue.Queue()
+        self._inode = None
+        self.reopen()
+
+    def _connect(self):
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def reopen(self):
+        connections = [self._connect() for _ in range(self.size)]
+        with self._lock:
+            stale, self._idle = self._idle, queue.Queue()
+            self._generation += 1
+            self._inode = os.stat(self.path).st_ino
+            for conn in connections:
+                self._idle.put((self._generation, conn))
+        while not stale.empty():
+            stale.get_nowait()[1].close()
+
+    def reopen_if_replaced(self):
+        """Reopens the connections if the path now points at a different file."""
+        if os.stat(self.path).st_ino != self._inode:
+            logging.info(f"{self.path} was replaced, reopening connections")
+            self.reopen()
+
+    @contextmanager
+    def connection(self):
+        while True:
+            try:
+                # Re-read the queue on each wait: reopen() may have replaced it meanwhile
+                generation, conn = self._idle.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._idle.put((generation, conn))
+                else:
+                    conn.close()
+
+    def close(self):
+        with self._lock:
+            self._generation += 1
+            stale, self._idle = self._idle, queue.Queue()
+        while not stale.empty():
+            stale.get_nowait()[1].close()
+
+
+class ExerciseStore:
+    """
+    The Exercises table held in memory as arrays sorted by id, so fetching a page of
+    recommendations is a binary search instead of a database query.
+    """
+
+    def __init__(self, ids, titles, descriptions):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.titles = np.asarray(titles, dtype=object)
+        self.descriptions = np.asarray(descriptions, dtype=object)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get_many(self, ids):
+        """{"title", "description"} for each id, in order; None for ids not in the table."""
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.ids, ids), max(len(self.ids) - 1, 0))
+        found = self.ids[positions] == ids if len(self.ids) else np.zeros(len(ids), dtype=bool)
+        return [{"title": self.titles[position], "description": self.descriptions[position]} if hit else None
+                for position, hit in zip(positions.tolist(), found.tolist())]
+
+
+def load_exercise_store(pool):
+    """Reads the whole Exercises table through the pool."""
+    pool.reopen_if_replaced()
+    with pool.connection() as conn:
+        rows = conn.execute("SELECT id, title, description FROM Exercises ORDER BY id").fetchall()
+    ids, titles, descriptions = zip(*rows) if rows else ((), (), ())
+    logging.info(f"Loaded {len(rows)} exercises from {pool.path}")
+    return ExerciseStore(ids, titles, descriptions)
+
+
+# ------------------------------
+# Main Function with CLI via argparse
+# ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Build the exercise database served by /api/recommendations")
+    parser.add_argument('--exercises_file', type=str, default=DEFAULT_EXERCISES_FILE, help="Exercises dataset CSV")
+    parser.add_argument('--output', type=str, default=DEFAULT_DATABASE_PATH, help="SQLite database to write")
+    args = parser.parse_args()
+
+    try:
+        build_exercise_database(args.exercises_file, args.output)
+    except Exception as e:
+        logging.error(f"Build Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
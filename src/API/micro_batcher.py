@@ -0,0 +1,94 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Collects concurrent scoring requests for a short window and scores them with one
+    call. score_fn takes a list of profiles and returns one result per profile, in order.
+
+    A batch is flushed when window_ms has passed since its first request arrived or when
+    it holds max_batch_size profiles. If the combined call fails, each request in the
+    batch is retried on its own so that one bad request does not fail its neighbours.
+    """
+
+    def __init__(self, score_fn, window_ms=5.0, max_batch_size=64):
+        self.score_fn = score_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.profiles = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = Counter()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, profiles):
+        """Queues profiles for the next batch and blocks until their results are ready."""
+        future = Future()
+        self._queue.put((profiles, future))
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return future.result()
+
+    def _collect(self):
+        """Blocks for the first request, then gathers more until the window closes or the batch is full."""
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.window
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch, size
+
+    def _run(self):
+        while True:
+            batch, size = self._collect()
+            with self._lock:
+                self.batches += 1
+                self.requests += len(batch)
+                self.profiles += size
+                self.batch_sizes[size] += 1
+            try:
+                results = self.score_fn([profile for profiles, _ in batch for profile in profiles])
+            except Exception as e:
+                if len(batch) > 1:
+                    logging.warning(f"Batch of {len(batch)} requests failed ({e}); scoring them one by one")
+                for profiles, future in batch:
+                    try:
+                        future.set_result(self.score_fn(profiles))
+                    except Exception as request_error:
+                        future.set_exception(request_error)
+                continue
+            start = 0
+            for profiles, future in batch:
+                future.set_result(results[start:start + len(profiles)])
+                start += len(profiles)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'window_ms': self.window * 1000.0,
+                'max_batch_size': self.max_batch_size,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'batches': self.batches,
+                'requests': self.requests,
+                'profiles': self.profiles,
+                'mean_batch_size': self.profiles / self.batches if self.batches else 0.0,
+                'batch_sizes': {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            }
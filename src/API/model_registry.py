@@ -0,0 +1,96 @@
+import logging
+import os
+import threading
+import time
+
+
+def file_version(path):
+    """Version id for a single artifact file: changes whenever the file is replaced or rewritten."""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+class ModelRegistry:
+    """
+    Serves the current version of a model and swaps in new versions without downtime.
+
+    version_fn returns the id of the newest artifact (cheap, polled every poll_seconds),
+    load_fn(version) loads it and warmup_fn(model) runs a few predictions on it. All of
+    this happens on a background thread; only then is the (version, model) pair replaced
+    in one assignment. Callers take a snapshot with current() and use it for the whole
+    request, so in-flight requests finish on the model they started with.
+    """
+
+    def __init__(self, name, version_fn, load_fn, warmup_fn=None, poll_seconds=30.0):
+        self.name = name
+        self.version_fn = version_fn
+        self.load_fn = load_fn
+        self.warmup_fn = warmup_fn
+        self.poll_seconds = poll_seconds
+        self._current = (None, None)
+        self._failed_version = None
+        self._check_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.failures = 0
+
+    def current(self):
+        """Returns (version, model); (None, None) until a version has loaded."""
+        return self._current
+
+    def check(self):
+        """Loads, warms and swaps in the newest version if it differs from the current one."""
+        with self._check_lock:
+            try:
+                version = self.version_fn()
+            except Exception as e:
+                logging.warning(f"{self.name}: could not resolve the model version: {e}")
+                return False
+            if version == self._current[0] or version == self._failed_version:
+                return False
+            start = time.perf_counter()
+            try:
+                model = self.load_fn(version)
+                if self.warmup_fn is not None:
+                    self.warmup_fn(model)
+            except Exception as e:
+                self.failures += 1
+                self._failed_version = version
+                logging.error(f"{self.name}: loading version {version} failed, keeping {self._current[0]}: {e}")
+                return False
+            previous = self._current[0]
+            self._current = (version, model)
+            self._failed_version = None
+            self.loaded_at = time.time()
+            if previous is not None:
+                self.reloads += 1
+            logging.info(f"{self.name}: serving version {version} (was {previous}), "
+                         f"loaded and warmed in {time.perf_counter() - start:.2f}s")
+            return True
+
+    def start(self):
+        """Loads the current version, then keeps watching for new ones on a daemon thread."""
+        self.check()
+        if self.poll_seconds > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name=f"{self.name}-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.check()
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'version': self._current[0],
+            'loaded_at': self.loaded_at,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'poll_seconds': self.poll_seconds,
+        }
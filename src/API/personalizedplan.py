@@ -1,11 +1,19 @@
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import pickle
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import sqlite3
 import logging
+import os
+import sys
+
+from exercise_store import DEFAULT_DATABASE_PATH, SQLiteConnectionPool, database_version, load_exercise_store
+from model_registry import ModelRegistry, file_version
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+AI_DIR = os.path.join(API_DIR, "..", "AI")
+sys.path.insert(0, AI_DIR)
+
+from tfidf_store import load_tfidf
+from recommendation_table import LiveScorer, load_recommendation_table, recommendation_page
 
 app = FastAPI()
 
@@ -28,12 +36,62 @@ class UserInput(BaseModel):
     level: str
     days_per_week: int
 
-try:
-    with open('../AI/main.pkl', 'rb') as f:
-        tfidf_matrix, tfidf_vectorizer = pickle.load(f)
-except FileNotFoundError:
-    print("Error: main.pkl not found!")
-    tfidf_matrix, tfidf_vectorizer = None, None
+# An index exported by tfidf_store.py is memory-mapped, so all workers share one copy of the matrix;
+# a pickled main.pkl is still accepted
+TFIDF_INDEX_DIR = os.path.join(AI_DIR, "tfidf_index")
+TFIDF_PATH = os.environ.get("FYTAI_TFIDF_PATH",
+                            TFIDF_INDEX_DIR if os.path.isdir(TFIDF_INDEX_DIR) else os.path.join(AI_DIR, "main.pkl"))
+TFIDF_POLL_SECONDS = float(os.environ.get("FYTAI_TFIDF_POLL_SECONDS", "30"))  # 0 disables reloading
+# Top-k results for every body part/level pair, built offline by recommendation_table.py
+RECOMMENDATION_TABLE_PATH = os.environ.get("FYTAI_RECOMMENDATION_TABLE",
+                                           os.path.join(AI_DIR, "recommendation_table.json"))
+MAX_RECOMMENDATIONS = 50
+
+def tfidf_artifact_version():
+    table_version = file_version(RECOMMENDATION_TABLE_PATH) if os.path.exists(RECOMMENDATION_TABLE_PATH) else "-"
+    return f"{file_version(TFIDF_PATH)}/{table_version}"
+
+def load_tfidf_artifacts(version):
+    """Returns (scorer, table); table is None when no matching table was built."""
+    tfidf_matrix, tfidf_vectorizer = load_tfidf(TFIDF_PATH)
+    table = load_recommendation_table(RECOMMENDATION_TABLE_PATH, tfidf_matrix, tfidf_vectorizer)
+    logging.info(f"Recommendation table: {'loaded' if table else 'not available, scoring live'}")
+    return LiveScorer(tfidf_matrix, tfidf_vectorizer), table
+
+def warm_up_tfidf(tfidf):
+    scorer, _ = tfidf
+    scorer.top_k("Chest", "Beginner", MAX_RECOMMENDATIONS)
+
+# The TF-IDF artifact and table are watched and hot-swapped when replaced; requests keep the snapshot they started with
+tfidf_registry = ModelRegistry("tfidf", version_fn=tfidf_artifact_version, load_fn=load_tfidf_artifacts,
+                               warmup_fn=warm_up_tfidf, poll_seconds=TFIDF_POLL_SECONDS)
+
+# Exercise titles and descriptions are served from memory; the database is only read when it changes
+DATABASE_PATH = os.environ.get("FYTAI_DATABASE_PATH", DEFAULT_DATABASE_PATH)
+DATABASE_POOL_SIZE = int(os.environ.get("FYTAI_DATABASE_POOL_SIZE", "2"))
+DATABASE_POLL_SECONDS = float(os.environ.get("FYTAI_DATABASE_POLL_SECONDS", "30"))  # 0 disables reloading
+database_pool = None
+
+def load_exercises(version):
+    """Opens the read-only connection pool on first use, then reads the Exercises table into memory."""
+    global database_pool
+    if database_pool is None:
+        database_pool = SQLiteConnectionPool(DATABASE_PATH, DATABASE_POOL_SIZE)
+    return load_exercise_store(database_pool)
+
+exercise_registry = ModelRegistry("exercises", version_fn=lambda: database_version(DATABASE_PATH),
+                                  load_fn=load_exercises, poll_seconds=DATABASE_POLL_SECONDS)
+
+@app.on_event("startup")
+def load_registries():
+    tfidf_registry.start()
+    exercise_registry.start()
+
+@app.on_event("shutdown")
+def close_database_pool():
+    exercise_registry.stop()
+    if database_pool is not None:
+        database_pool.close()
 
 def calculate_bmi(weight, height):
     if height <= 0:
@@ -50,48 +108,44 @@ def get_fitness_goal(bmi):
     else:
         return "Consult a healthcare professional for personalized advice."
 
-def get_recommended_plan(index):
-    try:
-        conn = sqlite3.connect("gym_database.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT title, description FROM Exercises WHERE id = ?", (index + 1,))
-        result = cursor.fetchone()
-        conn.close()
-        if result:
-            return {"title": result[0], "description": result[1]}
-        else:
-            return None
-    except sqlite3.Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+def get_recommended_plans(exercises, indices):
+    """The exercises for TF-IDF row indices (row i is exercise id i + 1); missing rows come back as None, in order."""
+    return exercises.get_many([int(index) + 1 for index in indices])
 
 @app.get("/api/recommendations")
-async def process_user_data(
+def process_user_data(
     weight: float = Query(..., description="User's weight"),
     height: float = Query(..., description="User's height"),
     body_part: str = Query(..., description="Target body part"),
     level: str = Query(..., description="Fitness level"),
     days_per_week: int = Query(..., description="Days per week to workout"),
+    k: int = Query(1, ge=1, le=MAX_RECOMMENDATIONS, description="Number of ranked exercises to return"),
+    offset: int = Query(0, ge=0, description="Rank to start from, for paging through results"),
 ):
     try:
         bmi = calculate_bmi(weight, height)
         fitness_goal = get_fitness_goal(bmi)
 
-        if not tfidf_vectorizer or not tfidf_matrix:
+        model_version, tfidf = tfidf_registry.current()
+        if tfidf is None:
             raise HTTPException(status_code=500, detail="Model is not loaded properly")
+        scorer, table = tfidf
+        _, exercises = exercise_registry.current()
+        if exercises is None:
+            raise HTTPException(status_code=500, detail="Exercise data is not loaded")
 
-        user_vector = tfidf_vectorizer.transform(
-            [f"{body_part} {level}"]
-        )
-
-        similarities = cosine_similarity(user_vector, tfidf_matrix)
-        recommended_index = np.argmax(similarities)
-
-        recommended_plan = get_recommended_plan(recommended_index)
+        page = recommendation_page(scorer, table, body_part, level, k, offset)
+        plans = get_recommended_plans(exercises, page)
+        recommendations = [dict(plan, rank=offset + i + 1) for i, plan in enumerate(plans) if plan is not None]
 
         return {
             "bmi": bmi,
             "fitness_goal": fitness_goal,
-            "recommended_plan": recommended_plan,
+            "recommended_plan": plans[0] if plans else None,
+            "recommendations": recommendations,
+            "k": k,
+            "offset": offset,
+            "model_version": model_version,
         }
 
     except ValueError as e:
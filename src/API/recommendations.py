@@ -1,104 +1,189 @@
-from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel
-import pandas as pd
-import pickle
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import json
 import logging
 import os
-import subprocess  # For running the main.py script
-import json
+import sys
+
+AI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AI")
+DATABASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "database")
+sys.path.insert(0, AI_DIR)
+
+from main import BATCH_CHUNK_SIZE
+from plan_engine import PlanEngine
+from plan_cache import PlanCache
+from model_store import load_model_artifact, resolve_model_version
+from model_registry import ModelRegistry
 
 app = FastAPI()
 
 logging.basicConfig(level=logging.INFO)
 
+MEMBERS_FILE = os.environ.get("FYTAI_MEMBERS_FILE", os.path.join(DATABASE_DIR, "gym_members_exercise_tracking.csv"))
+EXERCISES_FILE = os.environ.get("FYTAI_EXERCISES_FILE", os.path.join(DATABASE_DIR, "megaGymDataset.csv"))
+MODEL_DIR = os.environ.get("FYTAI_MODEL_DIR", os.path.join(AI_DIR, "models"))
+PLAN_CACHE_SIZE = int(os.environ.get("FYTAI_PLAN_CACHE_SIZE", "10000"))  # 0 disables the cache
+PLAN_CACHE_TTL = float(os.environ.get("FYTAI_PLAN_CACHE_TTL", "3600"))
+# Label plans with the BMI/body-fat rule the model was trained on; "0" always runs the model
+RULE_FAST_PATH = os.environ.get("FYTAI_RULE_FAST_PATH", "1") != "0"
+MODEL_POLL_SECONDS = float(os.environ.get("FYTAI_MODEL_POLL_SECONDS", "30"))  # 0 disables reloading
+
+WARMUP_USER_DATA = {
+    'Age': 30, 'Gender': 'Male', 'Level': 'Intermediate', 'Weight (kg)': 75.0, 'Height_m': 1.78,
+    'Resting_BPM': 65, 'Fat_Percentage': 20.0, 'Water_Intake (liters)': 2.5, 'Workout_Frequency (days/week)': 4
+}
+
 class UserInput(BaseModel):
-    Age: int
+    # Bounds reject values the plan generator cannot handle with a 422 instead of a 500
+    Age: int = Field(ge=0)
     Gender: str
     Level: str
-    Weight_kg: float
-    Height_m: float
-    Resting_BPM: int
-    Fat_Percentage: float
-    Water_Intake_liters: float
-    Workout_Frequency_days_week: int
-    Workout_Days: int
-    Exercises_Per_Day: int
+    Weight_kg: float = Field(gt=0)
+    Height_m: float = Field(gt=0)
+    Resting_BPM: int = Field(gt=0)
+    Fat_Percentage: float = Field(ge=0, lt=100)
+    Water_Intake_liters: float = Field(ge=0)
+    Workout_Frequency_days_week: int = Field(ge=0, le=7)
+    Workout_Days: int = Field(ge=1, le=7)
+    Exercises_Per_Day: int = Field(ge=1, le=10)
     Preferred_Workout: str
     Focused_Body_Parts: str  # Comma-separated string
+    User_Id: Optional[str] = None  # Makes the generated plan reproducible for this user
 
-def run_main_script(user_data):
-    """Runs the main.py script with user data and returns the workout plan."""
-    try:
-        # Create a temporary JSON file to pass user data to main.py
-        user_data_file = "user_data.json"
-        with open(user_data_file, "w") as f:
-            json.dump(user_data, f)
-
-        # Run main.py with command-line arguments
-        members_file = "gym_members.csv"  # Replace with actual file path
-        exercises_file = "exercises.csv"  # Replace with actual file path
-        result = subprocess.run(
-            [
-                "python",
-                "main.py",
-                "--members_file",
-                members_file,
-                "--exercises_file",
-                exercises_file,
-            ],
-            capture_output=True,
-            text=True,
-            input=f"--user_data_file={user_data_file}",
-            shell=True,
-        )
-
-        # Delete the temporary JSON file
-        os.remove(user_data_file)
-
-        if result.returncode == 0:
-            # Parse the output from main.py (assuming it's a JSON string)
-            output = result.stdout.strip()
-            # Extract the workout plan part from the output.
-            workout_plan_start = output.find("AI-Generated Workout Plan:")
-            if workout_plan_start != -1:
-                workout_plan_str = output[workout_plan_start:]
-                # Convert the workout plan string to a JSON object
-                workout_plan_json = {}
-                current_day = None
-                for line in workout_plan_str.split('\n'):
-                    line = line.strip()
-                    if line.startswith('Day'):
-                        current_day = line[:-1]
-                        workout_plan_json[current_day] = []
-                    elif line.startswith('Exercise'):
-                        exercise_data = {}
-                        exercise_data['Exercise'] = line.split('(')[0].replace('Exercise:', '').strip()
-                        exercise_data['Type'] = line.split('(')[1].split(')')[0].strip()
-                        workout_plan_json[current_day].append(exercise_data)
-                return workout_plan_json
-            else:
-                logging.error("Workout plan not found in main.py output.")
-                return None
-        else:
-            logging.error(f"main.py script failed: {result.stderr}")
-            return None
-    except Exception as e:
-        logging.error(f"Error running main.py: {e}")
-        return None
+def to_user_data(user_input):
+    """Maps the API field names onto the column names used by the fitness-goal model."""
+    return {
+        'Age': user_input.Age,
+        'Gender': user_input.Gender.strip().capitalize(),
+        'Level': user_input.Level.strip().capitalize(),
+        'Weight (kg)': user_input.Weight_kg,
+        'Height_m': user_input.Height_m,
+        'Resting_BPM': user_input.Resting_BPM,
+        'Fat_Percentage': user_input.Fat_Percentage,
+        'Water_Intake (liters)': user_input.Water_Intake_liters,
+        'Workout_Frequency (days/week)': user_input.Workout_Frequency_days_week,
+        'Workout_Days': user_input.Workout_Days,
+        'Exercises_Per_Day': user_input.Exercises_Per_Day
+    }
+
+def parse_focused_body_parts(user_input):
+    return [part.strip() for part in user_input.Focused_Body_Parts.split(",") if part.strip()]
+
+def load_plan_engine(version):
+    """
+    The first version loads the datasets once for the lifetime of the service; later
+    versions only load the new model and share the catalog, index and cache.
+    """
+    _, engine = plan_registry.current()
+    if engine is None:
+        cache = PlanCache(PLAN_CACHE_SIZE, PLAN_CACHE_TTL) if PLAN_CACHE_SIZE > 0 else None
+        return PlanEngine.from_files(MEMBERS_FILE, EXERCISES_FILE, MODEL_DIR, version, cache=cache,
+                                     rule_fast_path=RULE_FAST_PATH)
+    model, _ = load_model_artifact(MODEL_DIR, version)
+    return engine.with_model(model, version)
+
+def warm_up_plan_engine(engine):
+    engine.predict(WARMUP_USER_DATA)
+
+# New model versions in MODEL_DIR (or a rollback pin) are loaded in the background and swapped in
+plan_registry = ModelRegistry("plan-model", version_fn=lambda: resolve_model_version(MODEL_DIR),
+                              load_fn=load_plan_engine, warmup_fn=warm_up_plan_engine,
+                              poll_seconds=MODEL_POLL_SECONDS)
+
+@app.on_event("startup")
+def start_plan_registry():
+    plan_registry.start()
+
+def current_plan_engine():
+    """Snapshot of the serving engine; a request uses it throughout, even if a new version is swapped in."""
+    _, engine = plan_registry.current()
+    if engine is None:
+        raise HTTPException(status_code=503, detail="Model is not loaded")
+    return engine
 
 @app.post("/api/workout_plan")
-async def generate_workout_plan(user_input: UserInput):
-    """Generates a workout plan using the main.py script."""
+def generate_workout_plan(user_input: UserInput, response: Response):
+    """Generates a workout plan with the in-process plan engine; X-Model-Version names the model used."""
+    plan_engine = current_plan_engine()
+    response.headers["X-Model-Version"] = str(plan_engine.model_version)
     try:
-        user_data = user_input.dict()
-        user_data["Focused_Body_Parts"] = [
-            part.strip() for part in user_data["Focused_Body_Parts"].split(",")
-        ]
-        workout_plan = run_main_script(user_data)
+        workout_plan = plan_engine.generate(to_user_data(user_input),
+                                            user_input.Preferred_Workout,
+                                            parse_focused_body_parts(user_input),
+                                            user_id=user_input.User_Id)
         if workout_plan:
             return workout_plan
         else:
             raise HTTPException(status_code=500, detail="Failed to generate workout plan.")
     except Exception as e:
         logging.error(f"API error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/workout_plans/batch")
+def generate_workout_plans_batch(user_inputs: List[UserInput]):
+    """
+    Generates plans for a whole cohort. Profiles are scored in chunks with one
+    predict_proba call each, and the results are streamed back as NDJSON, one line
+    per input in input order, so the response is never held in memory as a whole.
+    An input whose plan fails gets an {"index", "error"} line; the rest still stream.
+    """
+    plan_engine = current_plan_engine()
+
+    def generate_chunk(requests):
+        """Plans for one chunk; if the chunk fails, each request is retried alone so only the bad ones error."""
+        try:
+            return list(plan_engine.generate_many(requests))
+        except Exception as e:
+            logging.warning(f"Batch chunk failed, retrying its {len(requests)} profiles one by one: {e}")
+        results = []
+        for request in requests:
+            try:
+                results.append(next(plan_engine.generate_many([request])))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def ndjson_lines():
+        for start in range(0, len(user_inputs), BATCH_CHUNK_SIZE):
+            chunk = user_inputs[start:start + BATCH_CHUNK_SIZE]
+            requests = [(to_user_data(user_input), user_input.Preferred_Workout,
+                         parse_focused_body_parts(user_input), user_input.User_Id) for user_input in chunk]
+            for i, result in enumerate(generate_chunk(requests), start):
+                if isinstance(result, Exception):
+                    logging.error(f"Batch item {i} failed: {result}")
+                    yield json.dumps({"index": i, "User_Id": user_inputs[i].User_Id, "error": str(result)}) + "\n"
+                    continue
+                prediction, workout_plan = result
+                yield json.dumps({
+                    "index": i,
+                    "User_Id": user_inputs[i].User_Id,
+                    "predicted_fitness_focus": prediction,
+                    "workout_plan": workout_plan,
+                    "model_version": plan_engine.model_version
+                }) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson",
+                             headers={"X-Model-Version": str(plan_engine.model_version)})
+
+@app.get("/api/workout_plan/cache_stats")
+def plan_cache_stats():
+    """Reports the plan cache's size and hit/miss/eviction counters."""
+    _, plan_engine = plan_registry.current()
+    if plan_engine is None or plan_engine.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **plan_engine.cache.stats()}
+
+@app.get("/api/workout_plan/predictor_stats")
+def predictor_stats():
+    """Reports how many fitness-focus labels came from the rule fast path and how many ran the model."""
+    _, plan_engine = plan_registry.current()
+    if plan_engine is None:
+        return {"loaded": False}
+    return {"loaded": True, **plan_engine.predictor_stats()}
+
+@app.get("/api/workout_plan/model")
+def plan_model_info():
+    """Reports the model version being served and the reload counters."""
+    return plan_registry.stats()
\ No newline at end of file
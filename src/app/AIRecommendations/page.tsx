@@ -12,7 +12,7 @@ function AIRecommendations() {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const response = await fetch(`http://localhost:8000/api/recommendations?weight=${searchParams.get('weight')}&height=${searchParams.get('height')}&body_part=${searchParams.get('bodyPart')}&level=${searchParams.get('level')}&days_per_week=${searchParams.get('daysPerWeek')}`);
+                const response = await fetch(`http://localhost:8000/api/recommendations?weight=${searchParams.get('weight')}&height=${searchParams.get('height')}&body_part=${searchParams.get('bodyPart')}&level=${searchParams.get('level')}&days_per_week=${searchParams.get('daysPerWeek')}&k=10`);
                 if (response.ok) {
                     const data = await response.json();
                     setRecommendations(data);